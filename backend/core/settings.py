@@ -12,6 +12,7 @@ https://docs.djangoproject.com/en/4.2/ref/settings/
 
 import environ
 import os
+import sys
 from pathlib import Path
 
 # Initialize environ
@@ -36,6 +37,9 @@ SECRET_KEY = env('SECRET_KEY')
 # SECURITY WARNING: don't run with debug turned on in production!
 DEBUG = env('DEBUG')
 
+# `manage.py test`: a single process, so per-process defaults are safe
+TESTING = sys.argv[1:2] == ['test']
+
 ALLOWED_HOSTS = env.list('ALLOWED_HOSTS', default=['events-forms-backend.onrender.com', 'forms.lccia.in', 'localhost', '127.0.0.1'])
 
 
@@ -55,8 +59,10 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'forms.middleware.RequestIDMiddleware',
+    'forms.middleware.QueryInstrumentationMiddleware',  # Outermost, so it sees session/auth queries too
     'django.middleware.security.SecurityMiddleware',
-    'whitenoise.middleware.WhiteNoiseMiddleware',  # Added WhiteNoise
+    'forms.middleware.StaticFilesMiddleware',  # WhiteNoise, async-capable for ASGI
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -152,7 +158,7 @@ REST_FRAMEWORK = {
         'rest_framework.permissions.IsAuthenticatedOrReadOnly',
     ],
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'forms.authentication.ProfileJWTAuthentication',
     ],
 }
 
@@ -171,6 +177,19 @@ SIMPLE_JWT = {
     'AUTH_TOKEN_CLASSES': ('rest_framework_simplejwt.tokens.AccessToken',),
     'TOKEN_TYPE_CLAIM': 'token_type',
 }
+# Authenticate from the signed profile claims in access tokens, with no DB
+# lookup, while the user's profile is unchanged (see forms.authentication)
+JWT_TRUST_PROFILE_CLAIMS = env.bool('JWT_TRUST_PROFILE_CLAIMS', default=False)
+JWT_CLAIMS_CHECK_TTL = env.int('JWT_CLAIMS_CHECK_TTL', default=5)
+# Seconds before other workers see a block/unblock: how often each process
+# reloads the blocked user ids from the database (see forms.revocation)
+REVOCATION_POLL_INTERVAL = env.int('REVOCATION_POLL_INTERVAL', default=2)
+
+# Write-behind submissions: the async submit endpoint buffers submissions in
+# PendingSubmission and the flush_submissions worker group-commits them
+SUBMISSION_WRITE_BEHIND = env.bool('SUBMISSION_WRITE_BEHIND', default=False)
+SUBMISSION_FLUSH_SIZE = env.int('SUBMISSION_FLUSH_SIZE', default=500)
+SUBMISSION_FLUSH_INTERVAL = env.float('SUBMISSION_FLUSH_INTERVAL', default=1.0)
 
 # CORS Settings
 CORS_ALLOWED_ORIGINS = [
@@ -203,6 +222,8 @@ FRONTEND_URL = env('FRONTEND_URL', default='https://forms.lccia.in')
 # Media Files (Uploads)
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+# Unfinished chunked uploads (forms.uploads); kept out of MEDIA_ROOT, which is served
+UPLOAD_SESSION_DIR = env('UPLOAD_SESSION_DIR', default=os.path.join(BASE_DIR, 'upload-sessions'))
 
 # Email Settings
 EMAIL_BACKEND = env('EMAIL_BACKEND', default='django.core.mail.backends.console.EmailBackend')
@@ -212,3 +233,61 @@ EMAIL_USE_TLS = env.bool('EMAIL_USE_TLS', default=True)
 EMAIL_HOST_USER = env('EMAIL_HOST_USER', default='')
 EMAIL_HOST_PASSWORD = env('EMAIL_HOST_PASSWORD', default='')
 DEFAULT_FROM_EMAIL = env('DEFAULT_FROM_EMAIL', default='webmaster@localhost')
+
+# Cache (form schemas, permissions, profiles, invitee sets). Invalidation bumps
+# version keys in it, so every worker has to see the same one; CACHE_URL picks
+# the backend and is required outside DEBUG and tests:
+#   redis://localhost:6379/0       any Redis-compatible server (Redis, Valkey, KeyDB, ...)
+#   dbcache://forms_cache          a database table (created by migration 0032); every
+#                                  lookup is a query, so only for small deployments
+#   filecache:///var/tmp/forms     files on a disk all workers can reach
+#   locmemcache://                 per-process memory; the default under DEBUG and tests,
+#                                  rejected by the forms.E001 check otherwise (silence it
+#                                  for a single-process deployment)
+CACHES = {'default': env.cache_url('CACHE_URL', default='locmemcache://' if DEBUG or TESTING else environ.Env.NOTSET)}
+CACHES['default']['KEY_PREFIX'] = env('CACHE_KEY_PREFIX', default='forms')
+CACHES['default']['TIMEOUT'] = env.int('CACHE_TIMEOUT', default=60 * 60)
+if CACHES['default']['BACKEND'].rpartition('.')[2] in ('DatabaseCache', 'FileBasedCache', 'LocMemCache'):
+    # These cull at 300 entries by default
+    CACHES['default'].setdefault('OPTIONS', {}).setdefault('MAX_ENTRIES', env.int('CACHE_MAX_ENTRIES', default=50000))
+SILENCED_SYSTEM_CHECKS = env.list('SILENCED_SYSTEM_CHECKS', default=[])
+
+# Per-request SQL instrumentation (Server-Timing header + a log line per sampled request)
+QUERY_INSTRUMENTATION = env.bool('QUERY_INSTRUMENTATION', default=True)
+QUERY_INSTRUMENTATION_SAMPLE_RATE = env.float('QUERY_INSTRUMENTATION_SAMPLE_RATE', default=1.0 if DEBUG else 0.1)
+QUERY_SLOWEST_COUNT = env.int('QUERY_SLOWEST_COUNT', default=3)
+QUERY_DUPLICATE_THRESHOLD = env.int('QUERY_DUPLICATE_THRESHOLD', default=3)
+
+# Logging: JSON lines (LOG_FORMAT=text for plain) written by a background
+# thread. LOG_SAMPLE_RATES keeps a fraction of DEBUG/INFO records per logger,
+# e.g. LOG_SAMPLE_RATES=forms.views=0.1,forms.middleware=0.5
+# Under tests both levels default to ERROR to keep the runner's output clean.
+LOG_LEVEL = env('LOG_LEVEL', default='ERROR' if TESTING else 'WARNING')
+LOG_SAMPLE_RATES = env.dict('LOG_SAMPLE_RATES', cast={'value': float}, default={})
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'filters': {
+        'request_id': {'()': 'forms.log.RequestIDFilter'},
+        'sampling': {'()': 'forms.log.SamplingFilter', 'rates': LOG_SAMPLE_RATES},
+    },
+    'formatters': {
+        'json': {'()': 'forms.log.JSONFormatter'},
+        'text': {'format': '%(asctime)s %(levelname)s %(name)s [%(request_id)s] %(message)s'},
+    },
+    'handlers': {
+        'async': {
+            '()': 'forms.log.AsyncHandler',
+            'formatter': env('LOG_FORMAT', default='json'),
+            'filters': ['request_id', 'sampling'],
+        },
+    },
+    'root': {'handlers': ['async'], 'level': LOG_LEVEL},
+    'loggers': {
+        'forms': {'handlers': ['async'], 'level': env('FORMS_LOG_LEVEL', default='ERROR' if TESTING else 'INFO'), 'propagate': False},
+    },
+}
+if TESTING:
+    # Django's own logger defaults to INFO; 4xx warnings would reach the root handler
+    LOGGING['loggers']['django'] = {'level': LOG_LEVEL}
@@ -45,3 +45,30 @@ from .models import UserProfile
 class UserProfileAdmin(admin.ModelAdmin):
     list_display = ('user', 'mobile_number')
     search_fields = ('user__username', 'mobile_number')
+
+from .models import NotificationOutbox
+@admin.register(NotificationOutbox)
+class NotificationOutboxAdmin(admin.ModelAdmin):
+    list_display = ('response', 'kind', 'status', 'attempts', 'next_attempt_at', 'sent_at')
+    list_filter = ('status', 'kind')
+
+from .models import StoredBlob
+@admin.register(StoredBlob)
+class StoredBlobAdmin(admin.ModelAdmin):
+    list_display = ('sha256', 'path', 'size', 'ref_count', 'variants_status', 'last_uploaded_at')
+    list_filter = ('variants_status',)
+    search_fields = ('sha256', 'path')
+
+from .models import InviteeImport
+@admin.register(InviteeImport)
+class InviteeImportAdmin(admin.ModelAdmin):
+    list_display = ('form', 'status', 'requested_by', 'created_at', 'finished_at')
+    list_filter = ('status',)
+    exclude = ('rows', 'results')
+
+from .models import PendingSubmission
+@admin.register(PendingSubmission)
+class PendingSubmissionAdmin(admin.ModelAdmin):
+    list_display = ('id', 'form', 'respondent', 'created_at', 'status', 'rejected_reason')
+    list_filter = ('status',)
+    exclude = ('answers',)
@@ -0,0 +1,168 @@
+from django.db.models import Count, Q
+from django.db.models.functions import TruncDate
+
+from .models import Answer, Question, Response
+
+CHOICE_TYPES = ('radio', 'dropdown', 'boolean')
+MULTI_CHOICE_TYPES = ('checkbox',)
+NUMERIC_TYPES = ('slider', 'rating', 'linear_scale', 'nps')
+
+
+def summarize_form(form, lookups=None):
+    """
+    Per-question summaries for the results dashboard, computed with GROUP BY
+    queries. The number of queries is fixed; the payload grows with the number
+    of questions and distinct values, not with the number of responses.
+
+    `lookups` are extra filters on Response (e.g. a created_at range).
+    """
+    lookups = lookups or {}
+    responses = Response.objects.filter(form=form, **lookups)
+    answers = Answer.objects.filter(
+        response__form=form,
+        **{f'response__{key}': value for key, value in lookups.items()}
+    ).exclude(value__isnull=True).exclude(value='')
+
+    questions = list(
+        Question.objects.filter(section__form=form)
+        .order_by('section__order', 'order')
+        .prefetch_related('options')
+    )
+
+    # 1. Daily submissions
+    timeline = [
+        {'date': row['day'].isoformat(), 'count': row['count']}
+        for row in responses.annotate(day=TruncDate('created_at')).values('day').annotate(count=Count('id')).order_by('day')
+    ]
+
+    # 2. How many responses answered each question
+    answered = dict(answers.values_list('question_id').annotate(count=Count('id')).order_by())
+
+    # 3. Value counts for single-valued questions (choices and numeric scales)
+    value_counts = {}
+    grouped = (
+        answers.filter(question__question_type__in=CHOICE_TYPES + NUMERIC_TYPES)
+        .values_list('question_id', 'question__question_type', 'value', 'value_number')
+        .annotate(count=Count('id'))
+        .order_by()
+    )
+    for question_id, question_type, value, number, count in grouped:
+        if question_type in NUMERIC_TYPES:
+            # Typed column filled at submission; non-numeric text is left out
+            if number is None:
+                continue
+            value = number
+        value_counts.setdefault(question_id, []).append((value, count))
+
+    # 4. Checkbox answers are comma-joined option texts; count each option in one pass
+    checkbox_counts = _checkbox_counts(answers, [q for q in questions if q.question_type in MULTI_CHOICE_TYPES])
+
+    summaries = []
+    for question in questions:
+        summary = {
+            'id': question.id,
+            'text': question.text,
+            'question_type': question.question_type,
+            'answered': answered.get(question.id, 0),
+        }
+        if question.question_type in CHOICE_TYPES:
+            summary['options'] = _option_breakdown(question, value_counts.get(question.id, []))
+        elif question.question_type in MULTI_CHOICE_TYPES:
+            summary['options'] = [
+                {'option': opt.text, 'count': checkbox_counts.get((question.id, opt.id), 0)}
+                for opt in question.options.all()
+            ]
+        elif question.question_type in NUMERIC_TYPES:
+            summary.update(_numeric_summary(value_counts.get(question.id, [])))
+            if question.question_type == 'nps':
+                summary['nps'] = _nps_buckets(summary['histogram'])
+        summaries.append(summary)
+
+    return {
+        'form': form.id,
+        'total_responses': sum(row['count'] for row in timeline),
+        'timeline': timeline,
+        'questions': summaries,
+    }
+
+
+def _checkbox_counts(answers, questions):
+    aggregates = {}
+    for question in questions:
+        for opt in question.options.all():
+            text = opt.text
+            aggregates[f'q{question.id}_o{opt.id}'] = Count('id', filter=Q(question_id=question.id) & (
+                Q(value=text)
+                | Q(value__startswith=f'{text},')
+                | Q(value__endswith=f',{text}')
+                | Q(value__contains=f',{text},')
+            ))
+    if not aggregates:
+        return {}
+
+    counts = {}
+    for key, count in answers.aggregate(**aggregates).items():
+        question_id, opt_id = key[1:].split('_o')
+        counts[(int(question_id), int(opt_id))] = count
+    return counts
+
+
+def _option_breakdown(question, counts):
+    counts = dict(counts)
+    breakdown = []
+    for opt in question.options.all():
+        breakdown.append({'option': opt.text, 'count': counts.pop(opt.text, 0)})
+    if question.question_type == 'boolean':
+        for value in ('Yes', 'No'):
+            if not any(row['option'] == value for row in breakdown):
+                breakdown.append({'option': value, 'count': counts.pop(value, 0)})
+    # Values that no longer match an option (renamed or removed since submission)
+    for value, count in sorted(counts.items(), key=lambda item: -item[1]):
+        breakdown.append({'option': value, 'count': count})
+    return breakdown
+
+
+def _numeric_summary(counts):
+    histogram = {}
+    for number, count in counts:
+        histogram[number] = histogram.get(number, 0) + count
+
+    total = sum(histogram.values())
+    summary = {
+        'histogram': [{'value': _plain(value), 'count': histogram[value]} for value in sorted(histogram)],
+        'mean': None,
+        'median': None,
+    }
+    if not total:
+        return summary
+
+    summary['mean'] = round(sum(value * count for value, count in histogram.items()) / total, 2)
+
+    # Median straight off the histogram: walk the cumulative counts to the middle rank(s)
+    ordered = sorted(histogram.items())
+    middle = [(total - 1) // 2, total // 2]
+    picked, seen = [], 0
+    for value, count in ordered:
+        while middle and middle[0] < seen + count:
+            picked.append(value)
+            middle.pop(0)
+        seen += count
+    summary['median'] = _plain(sum(picked) / 2)
+    return summary
+
+
+def _nps_buckets(histogram):
+    detractors = sum(row['count'] for row in histogram if row['value'] <= 6)
+    passives = sum(row['count'] for row in histogram if 7 <= row['value'] <= 8)
+    promoters = sum(row['count'] for row in histogram if row['value'] >= 9)
+    total = detractors + passives + promoters
+    return {
+        'detractors': detractors,
+        'passives': passives,
+        'promoters': promoters,
+        'score': round((promoters - detractors) * 100 / total) if total else None,
+    }
+
+
+def _plain(number):
+    return int(number) if float(number).is_integer() else number
@@ -0,0 +1,64 @@
+from datetime import datetime, time
+
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+NUMBER_TYPES = ('numeric', 'slider', 'rating', 'linear_scale', 'nps')
+DATETIME_TYPES = ('date', 'datetime')
+BOOLEAN_TYPES = ('boolean',)
+OPTION_TYPES = ('radio', 'dropdown')
+
+TYPED_FIELDS = ['value_number', 'value_datetime', 'value_bool', 'value_option_id']
+
+TRUE_VALUES = ('yes', 'true', '1')
+FALSE_VALUES = ('no', 'false', '0')
+
+
+def typed_values(question_type, value, options=()):
+    """
+    Typed copies of an answer's raw text for the given question type, as a
+    dict over TYPED_FIELDS. Values that don't parse are left as None; the
+    text in Answer.value stays the source of truth.
+
+    `options` are the question's options, used to resolve radio/dropdown
+    answers (stored as the option text) to an option id.
+    """
+    typed = dict.fromkeys(TYPED_FIELDS)
+    if value is None:
+        return typed
+    value = str(value).strip()
+    if not value:
+        return typed
+
+    if question_type in NUMBER_TYPES:
+        try:
+            number = float(value)
+        except ValueError:
+            return typed
+        if number == number and abs(number) != float('inf'):
+            typed['value_number'] = number
+    elif question_type in DATETIME_TYPES:
+        typed['value_datetime'] = _parse_datetime(value)
+    elif question_type in BOOLEAN_TYPES:
+        if value.lower() in TRUE_VALUES:
+            typed['value_bool'] = True
+        elif value.lower() in FALSE_VALUES:
+            typed['value_bool'] = False
+    elif question_type in OPTION_TYPES:
+        typed['value_option_id'] = next((opt.id for opt in options if opt.text == value), None)
+    return typed
+
+
+def _parse_datetime(value):
+    try:
+        parsed = parse_datetime(value)
+        if parsed is None:
+            day = parse_date(value)
+            if day is None:
+                return None
+            parsed = datetime.combine(day, time.min)
+    except ValueError:
+        return None
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
@@ -0,0 +1,143 @@
+"""
+JWT authentication that resolves the user, their profile and their platform
+role ids without the per-request lookups the stock class leaves to the
+permission checks.
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+from .cache import get_version, make_key
+from .models import UserProfile
+
+# Trust the profile claims signed into access tokens (see profile_claims())
+# instead of reading the user from the database on every request
+TRUST_TOKEN_CLAIMS = getattr(settings, 'JWT_TRUST_PROFILE_CLAIMS', False)
+# How long this process reuses a user's profile version before asking the cache again
+CLAIMS_CHECK_TTL = getattr(settings, 'JWT_CLAIMS_CHECK_TTL', 5)
+
+# Everything but the password hash, which stays deferred until something asks for it
+_USER_FIELDS = [field.attname for field in User._meta.concrete_fields if field.attname != 'password']
+_PROFILE_FIELDS = [field.attname for field in UserProfile._meta.concrete_fields]
+_CLAIM_USER_FIELDS = ['id', 'username', 'email', 'is_superuser', 'is_staff', 'is_active']
+
+_versions = {}
+_versions_lock = threading.Lock()
+
+
+def profile_version(user_id):
+    """
+    Current version of the user's cached profile state, reused for
+    CLAIMS_CHECK_TTL seconds. Any change to the user or their profile bumps it.
+    """
+    now = time.monotonic()
+    entry = _versions.get(user_id)
+    if entry is None or entry[1] <= now:
+        entry = (get_version(make_key('user-profile', user_id)), now + CLAIMS_CHECK_TTL)
+        with _versions_lock:
+            _versions[user_id] = entry
+    return entry[0]
+
+
+def forget_profile_versions(*user_ids):
+    with _versions_lock:
+        for user_id in user_ids:
+            _versions.pop(user_id, None)
+
+
+def profile_claims(user, state):
+    """
+    Claims embedded in tokens issued to `user`: what authentication and the
+    permission checks need, plus the profile version they were read at.
+    """
+    return {
+        'username': user.username,
+        'email': user.email,
+        'is_superuser': user.is_superuser,
+        'is_staff': user.is_staff,
+        'platform_status': state.get('platform_status'),
+        'is_platform_admin': state.get('is_platform_admin', False),
+        'role_ids': state.get('role_ids', []),
+        'has_profile': bool(state),
+        'profile_version': profile_version(user.pk),
+    }
+
+
+def load_user(user_id):
+    """
+    The user with their profile and its role ids in one query (a LEFT JOIN
+    down to the roles table, one row per role), or None. The profile state
+    permission checks read is attached to the user, so they need no queries.
+    """
+    profile_columns = [f'profile__{name}' for name in _PROFILE_FIELDS]
+    queryset = User.objects.filter(pk=user_id)
+    rows = list(queryset.values_list(*_USER_FIELDS, *profile_columns, 'profile__roles'))
+    if not rows:
+        return None
+    first = rows[0]
+    user = User.from_db(queryset.db, _USER_FIELDS, first[:len(_USER_FIELDS)])
+    profile_values = first[len(_USER_FIELDS):-1]
+    if profile_values[0] is None:
+        user._profile_state = {}
+        return user
+    profile = UserProfile.from_db(queryset.db, _PROFILE_FIELDS, profile_values)
+    User.profile.related.set_cached_value(user, profile)
+    UserProfile.user.field.set_cached_value(profile, user)
+    user._profile_state = {
+        'platform_status': profile.platform_status,
+        'is_platform_admin': profile.is_platform_admin,
+        'role_ids': sorted(row[-1] for row in rows if row[-1] is not None),
+    }
+    return user
+
+
+def user_from_claims(token, user_id):
+    """
+    A User built from the token's signed claims, or None if it has none or
+    they predate a change to the user (their profile version has moved on).
+    Fields not in the token are deferred and load on first access.
+    """
+    if 'profile_version' not in token or token['profile_version'] != profile_version(user_id):
+        return None
+    user = User.from_db(
+        User.objects.db, _CLAIM_USER_FIELDS,
+        [user_id, token['username'], token['email'], token['is_superuser'], token['is_staff'], True],
+    )
+    user._profile_state = {
+        'platform_status': token['platform_status'],
+        'is_platform_admin': token['is_platform_admin'],
+        'role_ids': token['role_ids'],
+    } if token['has_profile'] else {}
+    return user
+
+
+class ProfileJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication that loads the user with their profile state in one
+    query, or with JWT_TRUST_PROFILE_CLAIMS on, from the token's claims with
+    no query at all. Claims are only trusted while the user's profile version
+    (bumped on any user or profile change, checked at most every
+    JWT_CLAIMS_CHECK_TTL seconds) matches the one they were issued at.
+    """
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError as e:
+            raise InvalidToken(_("Token contained no recognizable user identification")) from e
+        # simplejwt writes the id claim as a string
+        user_id = User._meta.pk.to_python(user_id)
+
+        user = user_from_claims(validated_token, user_id) if TRUST_TOKEN_CLAIMS else None
+        if user is None:
+            user = load_user(user_id)
+        if user is None:
+            raise AuthenticationFailed(_("User not found"), code='user_not_found')
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code='user_inactive')
+        return user
@@ -0,0 +1,523 @@
+"""
+In-process benchmarks for the hot API endpoints, driven through the Django
+test client against a throwaway test database (see the `benchmark`
+management command). Results are plain JSON so runs from different commits
+can be compared.
+"""
+import asyncio
+import gc
+import json
+import os
+import platform
+import statistics
+import subprocess
+import time
+import tempfile
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+from datetime import timedelta
+
+import django
+from asgiref.sync import ThreadSensitiveContext
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import AsyncClient
+from django.test.utils import (
+    CaptureQueriesContext, override_settings, setup_test_environment, teardown_test_environment,
+)
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from .answers import typed_values
+from .cache import stats as cache_stats
+from .models import Answer, Form, FormCollaborator, Option, Question, Response, Role, Section, UserProfile
+from .submissions import buffer_submission, flush_pending, load_schema, save_submission, schema_questions
+
+DEFAULT_SCALE = {
+    'forms': 10,
+    'questions': 20,
+    'options': 4,
+    'responses': 500,
+    'collaborators': 5,
+}
+PASSWORD = 'benchmark-password'
+# Cycled through when seeding questions: a mix of the typed answer columns
+QUESTION_TYPES = ['short_text', 'radio', 'numeric', 'dropdown', 'date', 'boolean', 'long_text', 'rating', 'email']
+CHOICE_TYPES = ('radio', 'dropdown', 'checkbox')
+
+
+@contextmanager
+def test_environment(keepdb=False, local_cache=False, threaded=False):
+    """
+    Run the body against a throwaway test database, so real data is never
+    touched. The configured cache backend is kept, so its round trips count in
+    the numbers, under a separate key prefix; `local_cache` swaps in an
+    isolated local-memory cache instead. `threaded` moves an in-memory SQLite test database to a file,
+    since concurrent writers on other threads would hit table locks, and
+    lets them wait longer for the file's write lock.
+    """
+    test_settings = connection.settings_dict['TEST']
+    if threaded and connection.vendor == 'sqlite':
+        if not test_settings.get('NAME'):
+            test_settings['NAME'] = os.path.join(tempfile.gettempdir(), 'forms-loadtest.sqlite3')
+        connection.settings_dict['OPTIONS'].setdefault('timeout', 60)
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, keepdb=keepdb)
+    if local_cache:
+        default_cache = {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'benchmark'}
+    else:
+        default_cache = settings.CACHES['default']
+        default_cache = {**default_cache, 'KEY_PREFIX': f"{default_cache.get('KEY_PREFIX', '')}benchmark"}
+    try:
+        with override_settings(CACHES={**settings.CACHES, 'default': default_cache}):
+            yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=keepdb)
+        teardown_test_environment()
+
+
+def seed(forms, questions, options, responses, collaborators):
+    """
+    Bulk-insert an owner, `collaborators` editors shared on every form, and
+    `forms` public forms with `questions` questions and `responses` answered
+    responses each. Returns what the scenarios need: the owner's username
+    and the first form's id.
+    """
+    password = make_password(PASSWORD)
+    owner = User.objects.create(username='bench-owner', email='owner@bench.test', password=password)
+    User.objects.bulk_create([
+        User(username=f'bench-editor-{i}', email=f'editor{i}@bench.test', password=password)
+        for i in range(collaborators)
+    ])
+    users = list(User.objects.filter(username__startswith='bench-editor-'))
+    UserProfile.objects.bulk_create([UserProfile(user=user) for user in [owner, *users]])
+    editor, _ = Role.objects.get_or_create(slug='editor', defaults={'name': 'Editor', 'is_system': True})
+
+    now = timezone.now()
+    Form.objects.bulk_create([
+        Form(title=f'Benchmark form {i}', description='Seeded by the benchmark command.',
+             creator=owner, is_public=True, published_at=now)
+        for i in range(forms)
+    ])
+    form_list = list(Form.objects.filter(creator=owner).order_by('id'))
+    FormCollaborator.objects.bulk_create([
+        FormCollaborator(form=form, user=user, role=editor) for form in form_list for user in users
+    ])
+
+    # Ten questions per section
+    per_section = 10
+    Section.objects.bulk_create([
+        Section(form=form, title=f'Section {s}', order=s)
+        for form in form_list for s in range((questions + per_section - 1) // per_section)
+    ])
+    sections = {}
+    for section in Section.objects.filter(form__in=form_list).order_by('order'):
+        sections.setdefault(section.form_id, []).append(section)
+    Question.objects.bulk_create([
+        Question(section=sections[form.id][q // per_section], text=f'Question {q}',
+                 question_type=QUESTION_TYPES[q % len(QUESTION_TYPES)], order=q)
+        for form in form_list for q in range(questions)
+    ])
+    question_list = list(Question.objects.filter(section__form__in=form_list).select_related('section'))
+    Option.objects.bulk_create([
+        Option(question=question, text=f'Choice {o}', order=o)
+        for question in question_list if question.question_type in CHOICE_TYPES for o in range(options)
+    ])
+    choices = {}
+    for option in Option.objects.filter(question__in=question_list).order_by('order'):
+        choices.setdefault(option.question_id, []).append(option)
+
+    by_form = {}
+    for question in question_list:
+        by_form.setdefault(question.section.form_id, []).append(question)
+    for form in form_list:
+        _seed_responses(form, by_form.get(form.id, []), choices, responses)
+
+    return {'username': owner.username, 'form_id': form_list[0].id if form_list else None}
+
+
+def _seed_responses(form, questions, choices, count, batch_size=500):
+    for start in range(0, count, batch_size):
+        batch = Response.objects.bulk_create([
+            Response(form=form) for _ in range(start, min(count, start + batch_size))
+        ])
+        if not connection.features.can_return_rows_from_bulk_insert:
+            batch = list(Response.objects.filter(form=form).order_by('-id')[:len(batch)])
+        answers = []
+        for n, response in enumerate(batch, start=start):
+            for question in questions:
+                options = choices.get(question.id, ())
+                value = answer_value(question.question_type, [option.text for option in options], n)
+                answer = Answer(response=response, question=question, value=value)
+                for field, typed in typed_values(question.question_type, value, options).items():
+                    setattr(answer, field, typed)
+                answers.append(answer)
+        Answer.objects.bulk_create(answers, batch_size=2000)
+
+
+def answer_value(kind, choices, n):
+    """
+    Plausible answer text for the n-th response to a question of type `kind`.
+    """
+    if kind in CHOICE_TYPES:
+        return choices[n % len(choices)] if choices else ''
+    if kind in ('numeric', 'rating'):
+        return str(n % 5 + 1)
+    if kind == 'date':
+        return (timezone.now().date() - timedelta(days=n % 365)).isoformat()
+    if kind == 'boolean':
+        return 'Yes' if n % 2 else 'No'
+    if kind == 'email':
+        return f'respondent{n}@bench.test'
+    return f'Answer {n}'
+
+
+class Scenario:
+    """
+    One endpoint under test. `prepare(client)` runs once and returns the
+    request callable; the callable returns the response, fully consumed.
+    """
+    def __init__(self, name, prepare, expected_status=200, authenticated=True):
+        self.name = name
+        self.prepare = prepare
+        self.expected_status = expected_status
+        self.authenticated = authenticated
+
+
+def _consume(response):
+    # Streaming responses (export_csv) do their work while being iterated
+    if getattr(response, 'streaming', False):
+        for _ in response.streaming_content:
+            pass
+    return response
+
+
+def scenarios(context):
+    form_id = context['form_id']
+
+    def form_retrieve(client):
+        return lambda i: client.get(f'/api/forms/{form_id}/')
+
+    def response_submit(client, path='/api/responses/'):
+        form = client.get(f'/api/forms/{form_id}/').json()
+        questions = [q for section in form['sections'] for q in section['questions']]
+
+        def submit(i):
+            answers = [
+                {'question': q['id'], 'value': answer_value(
+                    q['question_type'], [option['text'] for option in q.get('options') or []], i
+                )}
+                for q in questions
+            ]
+            return client.post(path, {'form': form_id, 'answers': answers}, format='json')
+        return submit
+
+    def response_submit_async(client):
+        return response_submit(client, f'/api/forms/{form_id}/submit/')
+
+    def response_list(client):
+        return lambda i: client.get('/api/responses/', {'form': form_id})
+
+    def export_csv(client):
+        return lambda i: _consume(client.get('/api/responses/export_csv/', {'form': form_id}))
+
+    def form_update(client):
+        form = client.get(f'/api/forms/{form_id}/').json()
+
+        def update(i):
+            # What the editor sends on save: the whole tree, one field changed
+            form['title'] = f'Benchmark form (edit {i})'
+            form['sections'][0]['questions'][0]['text'] = f'Question 0 (edit {i})'
+            return client.put(f'/api/forms/{form_id}/', form, format='json')
+        return update
+
+    def token_obtain(client):
+        return lambda i: client.post(
+            '/api/token/', {'username': context['username'], 'password': PASSWORD}, format='json'
+        )
+
+    return [
+        Scenario('form_retrieve', form_retrieve),
+        Scenario('form_retrieve_anonymous', form_retrieve, authenticated=False),
+        Scenario('response_submit', response_submit, expected_status=201, authenticated=False),
+        Scenario('response_submit_async', response_submit_async, expected_status=201, authenticated=False),
+        Scenario('response_list', response_list),
+        Scenario('export_csv', export_csv),
+        Scenario('form_update', form_update),
+        Scenario('token_obtain', token_obtain, authenticated=False),
+    ]
+
+
+def make_client(context, authenticated):
+    client = APIClient()
+    if authenticated:
+        # A real bearer token, so authentication is part of what is measured
+        token = client.post(
+            '/api/token/', {'username': context['username'], 'password': PASSWORD}, format='json'
+        ).json()['access']
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+    return client
+
+
+def run_scenario(scenario, context, iterations=20, warmup=3, memory_iterations=3):
+    """
+    Time `iterations` requests after `warmup` untimed ones, counting queries
+    for each, then repeat a few under tracemalloc for peak memory (kept
+    separate because tracing slows everything down).
+    """
+    client = make_client(context, scenario.authenticated)
+    request = scenario.prepare(client)
+    statuses = set()
+    for i in range(warmup):
+        statuses.add(_consume(request(-1 - i)).status_code)
+
+    cache_stats(reset=True)
+    timings, queries = [], []
+    for i in range(iterations):
+        gc.collect()
+        with CaptureQueriesContext(connection) as ctx:
+            start = time.perf_counter()
+            response = _consume(request(i))
+            timings.append((time.perf_counter() - start) * 1000)
+        queries.append(len(ctx.captured_queries))
+        statuses.add(response.status_code)
+
+    cache = cache_stats(reset=True)
+
+    peaks = []
+    tracemalloc.start()
+    try:
+        for i in range(memory_iterations):
+            tracemalloc.reset_peak()
+            baseline = tracemalloc.get_traced_memory()[0]
+            _consume(request(iterations + i))
+            peaks.append(tracemalloc.get_traced_memory()[1] - baseline)
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'status': sorted(statuses),
+        'ok': statuses == {scenario.expected_status},
+        'iterations': iterations,
+        'latency_ms': summarize(timings),
+        'queries': {'min': min(queries), 'max': max(queries), 'median': statistics.median(queries)},
+        'peak_memory_kb': round(max(peaks) / 1024, 1) if peaks else None,
+        'cache': cache,
+    }
+
+
+def summarize(values):
+    ordered = sorted(values)
+    return {
+        'min': round(ordered[0], 3),
+        'p50': round(statistics.median(ordered), 3),
+        'p95': round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 3),
+        'max': round(ordered[-1], 3),
+        'mean': round(statistics.fmean(ordered), 3),
+    }
+
+
+def run(scale=None, iterations=20, warmup=3, only=None):
+    """
+    Seed the current (test) database and run every scenario, or those named
+    in `only`. Returns the JSON-ready result document.
+    """
+    scale = {**DEFAULT_SCALE, **(scale or {})}
+    started = time.perf_counter()
+    context = seed(**scale)
+    seed_seconds = time.perf_counter() - started
+
+    results = {}
+    for scenario in scenarios(context):
+        if only and scenario.name not in only:
+            continue
+        results[scenario.name] = run_scenario(scenario, context, iterations, warmup)
+
+    return {
+        'meta': {
+            'commit': git_commit(),
+            'timestamp': timezone.now().isoformat(),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'database': connection.vendor,
+            'scale': scale,
+            'seed_seconds': round(seed_seconds, 2),
+            'warmup': warmup,
+        },
+        'results': results,
+    }
+
+
+def submission_load_test(concurrency_levels=(1, 10, 50), requests=200, flush_sizes=None):
+    """
+    Fire `requests` anonymous submissions at each concurrency level through
+    Django's ASGI handler in-process, at POST /api/responses/
+    (ResponseViewSet.create) and at the async POST /api/forms/<id>/submit/.
+    Each request gets its own thread-sensitive context, as under a real ASGI
+    server. Seeds the current (test) database first.
+
+    With `flush_sizes`, the submit endpoint is also run in write-behind mode,
+    and per-request commits are compared with group commits of each size
+    (see group_commit_comparison).
+    """
+    context = seed(**{**DEFAULT_SCALE, 'responses': 0})
+    form_id = context['form_id']
+    form = APIClient().get(f'/api/forms/{form_id}/').json()
+    questions = [q for section in form['sections'] for q in section['questions']]
+
+    def body(i, with_form):
+        answers = [
+            {'question': q['id'], 'value': answer_value(
+                q['question_type'], [option['text'] for option in q.get('options') or []], i
+            )}
+            for q in questions
+        ]
+        return {'form': form_id, 'answers': answers} if with_form else {'answers': answers}
+
+    endpoints = {
+        'responses_create': ('/api/responses/', True),
+        'async_submit': (f'/api/forms/{form_id}/submit/', False),
+    }
+    results = {}
+    for name, (path, with_form) in endpoints.items():
+        results[name] = [
+            asyncio.run(_burst(path, lambda i: body(i, with_form), concurrency, requests))
+            for concurrency in concurrency_levels
+        ]
+    report = {
+        'meta': {
+            'commit': git_commit(),
+            'timestamp': timezone.now().isoformat(),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'database': connection.vendor,
+            'questions': len(questions),
+            'requests': requests,
+        },
+        'results': results,
+    }
+    if flush_sizes:
+        path = endpoints['async_submit'][0]
+        with override_settings(SUBMISSION_WRITE_BEHIND=True):
+            results['async_submit_buffered'] = []
+            for concurrency in concurrency_levels:
+                results['async_submit_buffered'].append(
+                    asyncio.run(_burst(path, lambda i: body(i, False), concurrency, requests))
+                )
+                while flush_pending():
+                    pass
+        report['commit_modes'] = group_commit_comparison(form_id, requests, flush_sizes)
+    return report
+
+
+def group_commit_comparison(form_id, submissions=200, flush_sizes=(50, 500)):
+    """
+    Write the same `submissions` to the form directly, without HTTP: one
+    transaction each (save_submission, the submit endpoint's default), and
+    write-behind, i.e. one buffered INSERT each (buffer_submission) then
+    group commits of each flush size (flush_pending). Times both phases.
+    """
+    schema = load_schema(form_id)
+    questions = schema_questions(schema)
+    answers = [
+        [
+            {'question_id': q['id'], 'value': answer_value(
+                q['question_type'], [option['text'] for option in q.get('options') or []], i
+            )}
+            for q in questions.values()
+        ]
+        for i in range(submissions)
+    ]
+
+    def timed(work):
+        with CaptureQueriesContext(connection) as ctx:
+            start = time.perf_counter()
+            result = work()
+            seconds = time.perf_counter() - start
+        return result, seconds, len(ctx.captured_queries)
+
+    _, seconds, queries = timed(lambda: [save_submission(schema, questions, data) for data in answers])
+    modes = {'per_request': {
+        'seconds': round(seconds, 3),
+        'submissions_per_s': round(submissions / seconds, 1),
+        'queries': queries,
+    }}
+    for size in flush_sizes:
+        _, accept_seconds, accept_queries = timed(lambda: [buffer_submission(schema, data) for data in answers])
+
+        def drain():
+            transactions = 0
+            while flush_pending(size):
+                transactions += 1
+            return transactions
+        transactions, flush_seconds, flush_queries = timed(drain)
+        modes[f'group_commit_{size}'] = {
+            'accept_seconds': round(accept_seconds, 3),
+            'flush_seconds': round(flush_seconds, 3),
+            'seconds': round(accept_seconds + flush_seconds, 3),
+            'submissions_per_s': round(submissions / (accept_seconds + flush_seconds), 1),
+            'flush_transactions': transactions,
+            'queries': accept_queries + flush_queries,
+        }
+    return modes
+
+
+async def _burst(path, make_body, concurrency, requests):
+    semaphore = asyncio.Semaphore(concurrency)
+    timings, statuses = [], Counter()
+
+    async def submit(i):
+        async with semaphore, ThreadSensitiveContext():
+            start = time.perf_counter()
+            response = await AsyncClient().post(path, json.dumps(make_body(i)), content_type='application/json')
+            timings.append((time.perf_counter() - start) * 1000)
+            statuses[response.status_code] += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(submit(i) for i in range(requests)))
+    elapsed = time.perf_counter() - started
+    return {
+        'concurrency': concurrency,
+        'throughput_rps': round(requests / elapsed, 1),
+        'latency_ms': summarize(timings),
+        'status': {str(code): count for code, count in sorted(statuses.items())},
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, timeout=5
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def compare(baseline, current, threshold=0.2):
+    """
+    Regressions in `current` against `baseline` (both result documents):
+    p50 latency or peak memory up by more than `threshold` (a fraction), or
+    any increase in the median query count. Returns a list of messages.
+    """
+    regressions = []
+    for name, now in current['results'].items():
+        before = baseline.get('results', {}).get(name)
+        if before is None:
+            continue
+        if now['queries']['median'] > before['queries']['median']:
+            regressions.append(f"{name}: queries {before['queries']['median']} -> {now['queries']['median']}")
+        for label, old, new in (
+            ('p50 latency', before['latency_ms']['p50'], now['latency_ms']['p50']),
+            ('peak memory', before.get('peak_memory_kb'), now.get('peak_memory_kb')),
+        ):
+            if old and new and new > old * (1 + threshold):
+                regressions.append(f"{name}: {label} {old} -> {new} (+{(new / old - 1) * 100:.0f}%)")
+    return regressions
+
+
+def load(path):
+    with open(path) as fh:
+        return json.load(fh)
@@ -0,0 +1,151 @@
+import hashlib
+import os
+import re
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import F, Value
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from .models import Answer, Form, StoredBlob
+
+BLOB_DIR = 'uploads/blobs'
+BLOB_URL_RE = re.compile(r'/blobs/[0-9a-f]{2}/([0-9a-f]{64})')
+HASH_CHUNK_SIZE = getattr(settings, 'UPLOAD_CHUNK_SIZE', 1024 * 1024)
+# Unreferenced blobs younger than this are kept: an upload is referenced only
+# once the form is saved or the response submitted.
+GC_GRACE = getattr(settings, 'BLOB_GC_GRACE', 60 * 60 * 24)
+
+
+def file_digest(file_obj):
+    """
+    SHA-256 and size of a file, read in chunks. Returns (hexdigest, size).
+    """
+    sha256, size = hashlib.sha256(), 0
+    file_obj.seek(0)
+    for chunk in iter(lambda: file_obj.read(HASH_CHUNK_SIZE), b''):
+        sha256.update(chunk)
+        size += len(chunk)
+    file_obj.seek(0)
+    return sha256.hexdigest(), size
+
+
+def store_blob(file_obj, name, digest=None):
+    """
+    Store a file under its SHA-256 and return the StoredBlob. Content that is
+    already stored is not written again. `digest` is an optional precomputed
+    (sha256, size) from file_digest().
+    """
+    sha256, size = digest or file_digest(file_obj)
+
+    # Touching the row both checks for it and shields it from a concurrent
+    # collect_garbage(), which holds row locks while it deletes.
+    if StoredBlob.objects.filter(sha256=sha256).update(last_uploaded_at=timezone.now()):
+        return StoredBlob.objects.get(sha256=sha256)
+
+    ext = os.path.splitext(name)[1].lower()[:10]
+    content = file_obj if isinstance(file_obj, File) else File(file_obj)
+    path = default_storage.save(f'{BLOB_DIR}/{sha256[:2]}/{sha256}{ext}', content)
+    blob, created = StoredBlob.objects.get_or_create(sha256=sha256, defaults={'path': path, 'size': size})
+    if not created and blob.path != path:
+        # An identical upload won the race; keep its copy
+        default_storage.delete(path)
+    return blob
+
+
+def blob_refs(values):
+    """
+    Count the blob hashes referenced by the given URLs (None and non-blob
+    URLs are ignored).
+    """
+    refs = Counter()
+    for value in values:
+        if value:
+            refs.update(BLOB_URL_RE.findall(value))
+    return refs
+
+
+def retain(*urls):
+    _adjust(blob_refs(urls), 1)
+
+
+def release(*urls):
+    _adjust(blob_refs(urls), -1)
+
+
+def _adjust(refs, sign):
+    # One UPDATE per distinct multiplicity, usually just one
+    by_count = {}
+    for sha256, count in refs.items():
+        by_count.setdefault(count, []).append(sha256)
+    for count, hashes in by_count.items():
+        StoredBlob.objects.filter(sha256__in=hashes).update(
+            ref_count=Greatest(F('ref_count') + sign * count, Value(0))
+        )
+
+
+def form_file_urls(form_ids):
+    """
+    Every stored-file URL the given forms point at: branding images and
+    file_upload answers.
+    """
+    for logo, background in Form.objects.filter(id__in=form_ids).values_list('logo_image', 'background_image'):
+        yield logo
+        yield background
+    yield from answer_file_urls(response__form_id__in=form_ids)
+
+
+def answer_file_urls(**filters):
+    """
+    Stored-file URLs of the file_upload answers matching `filters`, e.g.
+    question_id__in=[...] for answers about to be deleted with their questions.
+    """
+    return Answer.objects.filter(question__question_type='file_upload', **filters).values_list('value', flat=True).iterator()
+
+
+def recount_references():
+    """
+    Rebuild every ref_count from the rows that reference blobs. Repairs
+    drift from deletes that bypass the API (admin, cascades, shell).
+    """
+    refs = blob_refs(Form.objects.values_list('logo_image', flat=True).iterator())
+    refs += blob_refs(Form.objects.values_list('background_image', flat=True).iterator())
+    refs += blob_refs(
+        Answer.objects.filter(question__question_type='file_upload').values_list('value', flat=True).iterator()
+    )
+    with transaction.atomic():
+        StoredBlob.objects.update(ref_count=0)
+        _adjust(refs, 1)
+    return refs
+
+
+def collect_garbage(grace=GC_GRACE, batch_size=500, dry_run=False):
+    """
+    Delete unreferenced blobs older than `grace` seconds (and their image
+    variants), files first.
+    Returns (count, bytes) freed.
+    """
+    cutoff = timezone.now() - timedelta(seconds=grace)
+    eligible = StoredBlob.objects.filter(ref_count__lte=0, last_uploaded_at__lt=cutoff)
+    if dry_run:
+        blobs = list(eligible.values_list('size', flat=True))
+        return len(blobs), sum(blobs)
+
+    count = freed = 0
+    while True:
+        with transaction.atomic():
+            batch = list(eligible.select_for_update(skip_locked=True).order_by('last_uploaded_at')[:batch_size])
+            if not batch:
+                return count, freed
+            for blob in batch:
+                for variant in blob.variants:
+                    default_storage.delete(variant['path'])
+                default_storage.delete(blob.path)
+                freed += blob.size
+            StoredBlob.objects.filter(sha256__in=[blob.sha256 for blob in batch]).delete()
+            count += len(batch)
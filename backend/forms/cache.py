@@ -0,0 +1,189 @@
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+# Cached values are keyed by a version counter; bumping the counter orphans
+# every older entry, so invalidation never has to find and delete them.
+# Queryset .update() calls on the tree bump nothing, so schemas also expire.
+SCHEMA_TIMEOUT = getattr(settings, 'FORM_SCHEMA_CACHE_TIMEOUT', 60)
+
+# Hit/miss counts per key namespace, for this process (see stats())
+_counts = Counter()
+_counts_lock = threading.Lock()
+
+
+def make_key(namespace, *parts):
+    """
+    Cache key 'namespace:part:...'. The namespace (form-schema,
+    role-permissions, ...) is what hit/miss counts are grouped by; the
+    backend adds the deployment-wide KEY_PREFIX.
+    """
+    return ':'.join(str(part) for part in (namespace, *parts))
+
+
+def count(namespace, hit):
+    with _counts_lock:
+        _counts[namespace, 'hits' if hit else 'misses'] += 1
+
+
+def stats(reset=False):
+    """
+    {namespace: {'hits', 'misses', 'hit_rate'}} for lookups made by this process.
+    """
+    with _counts_lock:
+        snapshot = dict(_counts)
+        if reset:
+            _counts.clear()
+    result = {}
+    for (namespace, kind), value in sorted(snapshot.items()):
+        result.setdefault(namespace, {'hits': 0, 'misses': 0})[kind] = value
+    for entry in result.values():
+        entry['hit_rate'] = round(entry['hits'] / (entry['hits'] + entry['misses']), 3)
+    return result
+
+
+def get_version(name):
+    key = make_key('version', name)
+    version = cache.get(key)
+    if version is None:
+        # Start from a clock value, not 1, so an evicted counter can't come
+        # back and line up with entries cached under the old one.
+        cache.add(key, time.time_ns(), None)
+        version = cache.get(key, time.time_ns())
+    return version
+
+
+def bump_version(*names):
+    """
+    Bump the given version counters once the current transaction commits, so
+    readers can't re-cache pre-commit data under the new version.
+    """
+    def bump():
+        for name in names:
+            if name is None:
+                continue
+            key = make_key('version', name)
+            try:
+                cache.incr(key)
+            except ValueError:
+                cache.set(key, time.time_ns(), None)
+    transaction.on_commit(bump)
+
+
+def versioned(name, build, timeout=None, current=None):
+    """
+    Value cached under the current version of `name`, calling build() on a
+    miss, or when current(value) says the cached value is out of date.
+    """
+    # Read the version before building: if a write lands meanwhile, what we
+    # store is filed under the version it has already superseded.
+    key = make_key(name, get_version(name))
+    value = cache.get(key)
+    if value is not None and current is not None and not current(value):
+        value = None
+    count(name.partition(':')[0], value is not None)
+    if value is None:
+        value = build()
+        cache.set(key, value, timeout)
+    return value
+
+
+def versioned_many(builds, timeout=None):
+    """
+    versioned() for several names in one cache round trip: {name: build}
+    -> {name: value}. Values live under a fixed key per name, tagged with the
+    version they were built at, so one get_many returns versions and values.
+    """
+    version_keys = {name: make_key('version', name) for name in builds}
+    found = cache.get_many([*version_keys.values(), *(make_key(name, 'tagged') for name in builds)])
+    values, built = {}, {}
+    for name, build in builds.items():
+        version = found.get(version_keys[name])
+        if version is None:
+            version = get_version(name)
+        entry = found.get(make_key(name, 'tagged'))
+        hit = entry is not None and entry[0] == version
+        count(name.partition(':')[0], hit)
+        if hit:
+            values[name] = entry[1]
+        else:
+            # Tagged with the version read before building, as in versioned()
+            values[name] = build()
+            built[make_key(name, 'tagged')] = (version, values[name])
+    if built:
+        cache.set_many(built, timeout)
+    return values
+
+
+def invalidate_form_schema(*form_ids):
+    bump_version(*(make_key('form-schema', form_id) for form_id in form_ids if form_id is not None))
+
+
+def invalidate_invitees(*form_ids):
+    bump_version(*(make_key('form-invitees', form_id) for form_id in form_ids if form_id is not None))
+
+
+def touch_forms(*form_ids):
+    """
+    Record a change anywhere in the given forms' trees: bump Form.version and
+    updated_at (the ETag / Last-Modified inputs) and drop the cached schemas.
+    """
+    from .models import Form
+    form_ids = {form_id for form_id in form_ids if form_id is not None}
+    if form_ids:
+        Form.objects.filter(id__in=form_ids).update(version=F('version') + 1, updated_at=timezone.now())
+        invalidate_form_schema(*form_ids)
+
+
+def bump_form_version(form):
+    """
+    Save `form` with its version bumped in the same UPDATE. The form_changed
+    signal drops the cached schema, so this is touch_forms() for a form that
+    is being saved anyway.
+    """
+    form.version = F('version') + 1
+    form.save()
+    form.refresh_from_db(fields=['version'])
+
+
+def get_form_schema(lookup):
+    """
+    Cached definition for a form id or slug, or None on a miss. Reads only
+    the cache: writes bump the schema's version key, and anything that slips
+    past them (queryset .update() on the tree) ages out with SCHEMA_TIMEOUT.
+    """
+    form_id = lookup
+    if not str(lookup).isdigit():
+        form_id = cache.get(make_key('form-slug', lookup))
+        if form_id is None:
+            count('form-schema', False)
+            return None
+    name = make_key('form-schema', form_id)
+    schema = cache.get(make_key(name, get_version(name)))
+    count('form-schema', schema is not None)
+    if schema is not None and not str(lookup).isdigit() and schema.get('slug') != lookup:
+        # The slug has since moved to another form or been renamed
+        return None
+    return schema
+
+
+def form_schema(form, build):
+    """
+    Cached definition for `form`, calling build(form) to serialize it on a
+    miss or when the cached one predates the form's version.
+    """
+    def build_and_index():
+        schema = build(form)
+        if schema.get('slug'):
+            cache.set(make_key('form-slug', schema['slug']), form.id, SCHEMA_TIMEOUT)
+        return schema
+    return versioned(
+        make_key('form-schema', form.id), build_and_index, SCHEMA_TIMEOUT,
+        current=lambda schema: schema['version'] == form.version,
+    )
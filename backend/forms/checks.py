@@ -0,0 +1,25 @@
+from django.conf import settings
+from django.core.checks import Error, register
+
+_PROCESS_LOCAL_CACHES = {
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+}
+
+
+@register()
+def shared_cache_check(app_configs, **kwargs):
+    """
+    Cache invalidation bumps version keys in the default cache, so outside
+    DEBUG and tests every worker must share it.
+    """
+    backend = settings.CACHES.get('default', {}).get('BACKEND')
+    if settings.DEBUG or getattr(settings, 'TESTING', False) or backend not in _PROCESS_LOCAL_CACHES:
+        return []
+    return [Error(
+        f"The default cache ({backend}) is local to each process, so changes made on one worker "
+        "would never invalidate what the others have cached.",
+        hint="Set CACHE_URL to a shared backend (redis://..., dbcache://forms_cache), or add "
+             "'forms.E001' to SILENCED_SYSTEM_CHECKS if only one process serves the site.",
+        id='forms.E001',
+    )]
@@ -0,0 +1,168 @@
+import io
+import logging
+import os
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from PIL import Image, ImageOps, UnidentifiedImageError, features
+
+from .blobs import BLOB_URL_RE, blob_refs
+from .cache import touch_forms
+from .models import Form, StoredBlob
+
+logger = logging.getLogger(__name__)
+
+VARIANT_WIDTHS = getattr(settings, 'IMAGE_VARIANT_WIDTHS', [480, 960, 1600, 2400])
+VARIANT_QUALITY = getattr(settings, 'IMAGE_VARIANT_QUALITY', 75)
+# Smallest first in each srcset; AVIF is listed before WebP so browsers that
+# support it pick it.
+VARIANT_FORMATS = [
+    (fmt, mime) for fmt, mime in (('AVIF', 'image/avif'), ('WEBP', 'image/webp'))
+    if features.check(fmt.lower())
+]
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.gif', '.webp', '.bmp', '.tif', '.tiff', '.avif')
+# How long a claimed blob is hidden from other workers before it is retried
+CLAIM_LEASE = getattr(settings, 'IMAGE_CLAIM_LEASE', 600)
+DERIVATIVE_DIR = 'uploads/derivatives'
+
+
+def queue_variants(blob):
+    """
+    Ask the process_images worker to build variants for a blob. Blobs that
+    already have (or are getting) variants are left alone. Only form branding
+    images get variants (see queue_form_images), not every upload.
+    """
+    if os.path.splitext(blob.path)[1].lower() not in IMAGE_EXTENSIONS:
+        return
+    StoredBlob.objects.filter(sha256=blob.sha256, variants_status='none').update(variants_status='pending')
+
+
+def queue_form_images(*urls):
+    """
+    queue_variants() for the blobs behind a form's logo and background URLs.
+    """
+    urls = [url for url in urls if url and os.path.splitext(url)[1].lower() in IMAGE_EXTENSIONS]
+    hashes = list(blob_refs(urls))
+    if hashes:
+        StoredBlob.objects.filter(sha256__in=hashes, variants_status='none').update(variants_status='pending')
+
+
+def process_pending(batch_size=10):
+    """
+    Build variants for one batch of queued blobs. Returns the number processed.
+    """
+    batch = _claim(batch_size)
+    for blob in batch:
+        try:
+            generate_variants(blob)
+        except (UnidentifiedImageError, Image.DecompressionBombError, OSError, ValueError):
+            blob.variants_status = 'failed'
+        except Exception:
+            # Anything else is a bug, but it mustn't strand the rest of the batch
+            logger.exception("image variants failed", extra={'event': 'images.failed', 'sha256': blob.sha256})
+            blob.variants_status = 'failed'
+        # update() rather than save(): the blob may have been collected meanwhile
+        StoredBlob.objects.filter(sha256=blob.sha256).update(
+            variants_status=blob.variants_status, variants=blob.variants, width=blob.width, height=blob.height
+        )
+
+    if batch:
+        _invalidate_forms([blob.sha256 for blob in batch if blob.variants_status == 'done'])
+    return len(batch)
+
+
+def _claim(batch_size):
+    now = timezone.now()
+    with transaction.atomic():
+        batch = list(
+            StoredBlob.objects.select_for_update(skip_locked=True)
+            .filter(
+                Q(variants_status='pending')
+                | Q(variants_status='processing', variants_claimed_at__lt=now - timedelta(seconds=CLAIM_LEASE))
+            )
+            .order_by('last_uploaded_at')[:batch_size]
+        )
+        StoredBlob.objects.filter(sha256__in=[blob.sha256 for blob in batch]).update(
+            variants_status='processing', variants_claimed_at=now
+        )
+    return batch
+
+
+def generate_variants(blob):
+    """
+    Write resized AVIF/WebP copies of `blob` next to each other under
+    uploads/derivatives/<sha256>/ and record them on the blob (not saved).
+    Files already on disk are reused, so a retried job only fills the gaps.
+    """
+    with default_storage.open(blob.path, 'rb') as source:
+        image = Image.open(source)
+        if getattr(image, 'is_animated', False):
+            # Resizing would keep only the first frame
+            blob.variants_status = 'skipped'
+            return
+        image = ImageOps.exif_transpose(image)
+        image.load()
+
+    if image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA' if 'transparency' in image.info or image.mode in ('LA', 'PA') else 'RGB')
+    blob.width, blob.height = image.size
+
+    widths = sorted({width for width in VARIANT_WIDTHS if width < image.width} | {min(image.width, max(VARIANT_WIDTHS))})
+    variants = []
+    for fmt, mime in VARIANT_FORMATS:
+        for width in widths:
+            height = max(1, round(image.height * width / image.width))
+            path = f'{DERIVATIVE_DIR}/{blob.sha256[:2]}/{blob.sha256}/{width}.{fmt.lower()}'
+            if not default_storage.exists(path):
+                resized = image if width == image.width else image.resize((width, height), Image.LANCZOS)
+                buffer = io.BytesIO()
+                resized.save(buffer, fmt, quality=VARIANT_QUALITY)
+                default_storage.save(path, ContentFile(buffer.getvalue()))
+            variants.append({'path': path, 'width': width, 'height': height, 'type': mime})
+
+    blob.variants = variants
+    blob.variants_status = 'done'
+
+
+def _invalidate_forms(hashes):
+    # Serialized forms embed the variant list; mark the ones using these blobs changed
+    query = Q()
+    for sha256 in hashes:
+        query |= Q(logo_image__contains=sha256) | Q(background_image__contains=sha256)
+    if query:
+        touch_forms(*Form.objects.filter(query).values_list('id', flat=True))
+
+
+def image_variants(urls, build_url=None):
+    """
+    Responsive-image metadata for the given image URLs, keyed by URL:
+    {'src', 'width', 'height', 'sources': [{'type', 'srcset'}, ...]}.
+    URLs without finished variants map to None.
+    """
+    hashes = {url: match.group(1) for url in urls if url and (match := BLOB_URL_RE.search(url))}
+    blobs = StoredBlob.objects.filter(sha256__in=set(hashes.values()), variants_status='done').in_bulk() if hashes else {}
+
+    build_url = build_url or (lambda url: url)
+    metadata = {}
+    for url in urls:
+        blob = blobs.get(hashes.get(url))
+        if blob is None:
+            metadata[url] = None
+            continue
+        sources = {}
+        for variant in blob.variants:
+            sources.setdefault(variant['type'], []).append(
+                f"{build_url(default_storage.url(variant['path']))} {variant['width']}w"
+            )
+        metadata[url] = {
+            'src': url,
+            'width': blob.width,
+            'height': blob.height,
+            'sources': [{'type': mime, 'srcset': ', '.join(srcset)} for mime, srcset in sources.items()],
+        }
+    return metadata
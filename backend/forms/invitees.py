@@ -0,0 +1,228 @@
+import csv
+import hashlib
+import io
+import threading
+import time
+from collections import OrderedDict
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.core.validators import validate_email
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .cache import count, get_version, invalidate_invitees, make_key
+from .models import FormInvitee, InviteeImport
+
+# Lists longer than this are imported by the import_invitees worker
+SYNC_LIMIT = getattr(settings, 'INVITEE_IMPORT_SYNC_LIMIT', 1000)
+BATCH_SIZE = getattr(settings, 'INVITEE_IMPORT_BATCH_SIZE', 1000)
+# How long a claimed import is hidden from other workers before it is retried
+CLAIM_LEASE = getattr(settings, 'INVITEE_IMPORT_CLAIM_LEASE', 600)
+# Invitee sets kept in each process's memory, most recently used first out
+LOCAL_FORMS = getattr(settings, 'INVITEE_CACHE_LOCAL_FORMS', 256)
+# How long a set lives in the cache, and then in process memory: should an
+# invalidation be missed, a removed invitee gets in for at most twice this
+INVITEE_CACHE_TIMEOUT = getattr(settings, 'INVITEE_CACHE_TIMEOUT', 60 * 5)
+
+_local_sets = OrderedDict()  # form id -> (version, frozenset of digests, expiry)
+_local_lock = threading.Lock()
+
+
+def normalize_email(raw):
+    """
+    Lower-cased, trimmed email, or None if it isn't a valid address.
+    """
+    email = (raw or '').strip().lower()
+    try:
+        validate_email(email)
+    except DjangoValidationError:
+        return None
+    return email
+
+
+def email_digest(email):
+    """
+    Fixed-size digest of a normalized email. 128 bits keeps the cached sets
+    compact while making a false match (and so a wrongly granted invite)
+    practically impossible, unlike a Bloom filter.
+    """
+    return hashlib.blake2b(email.encode(), digest_size=16).digest()
+
+
+def invitee_digests(form_id):
+    """
+    Frozen set of the digests of a form's invitee emails. Served from process
+    memory while the form's invitee version is unchanged, then from the shared
+    cache, and only rebuilt from the database after an invitee change or
+    INVITEE_CACHE_TIMEOUT seconds.
+    """
+    name = make_key('form-invitees', form_id)
+    version = get_version(name)
+    with _local_lock:
+        entry = _local_sets.get(form_id)
+        if entry and entry[0] == version and entry[2] > time.monotonic():
+            _local_sets.move_to_end(form_id)
+            count('form-invitees', True)
+            return entry[1]
+
+    key = make_key(name, version)
+    digests = cache.get(key)
+    count('form-invitees', digests is not None)
+    if digests is None:
+        digests = frozenset(
+            email_digest(email) for email in
+            FormInvitee.objects.filter(form_id=form_id).values_list('email_normalized', flat=True).iterator()
+        )
+        cache.set(key, digests, INVITEE_CACHE_TIMEOUT)
+
+    with _local_lock:
+        _local_sets[form_id] = (version, digests, time.monotonic() + INVITEE_CACHE_TIMEOUT)
+        _local_sets.move_to_end(form_id)
+        while len(_local_sets) > LOCAL_FORMS:
+            _local_sets.popitem(last=False)
+    return digests
+
+
+def is_invited(form_id, email):
+    email = (email or '').strip().lower()
+    return bool(email) and email_digest(email) in invitee_digests(form_id)
+
+
+def remove_invitee(form, email):
+    deleted, _ = form.invitees.filter(email_normalized=(email or '').strip().lower()).delete()
+    if deleted:
+        invalidate_invitees(form.id)
+    return deleted
+
+
+def rows_from_list(emails):
+    """
+    [(row number, raw value)] for a JSON list (or a single string).
+    """
+    if isinstance(emails, str):
+        emails = [emails]
+    return [(number, str(raw or '')) for number, raw in enumerate(emails, start=1)]
+
+
+def rows_from_csv(file_obj):
+    """
+    [(line number, raw value)] from an uploaded CSV. Uses the column headed
+    "email" if there is one, otherwise the first cell that looks like an
+    address. Blank lines are skipped.
+    """
+    text = io.TextIOWrapper(file_obj, encoding='utf-8-sig', errors='replace', newline='')
+    try:
+        reader = csv.reader(text)
+        rows, column = [], None
+        for number, cells in enumerate(reader, start=1):
+            cells = [cell.strip() for cell in cells]
+            if not any(cells):
+                continue
+            if number == 1:
+                headers = [cell.lower() for cell in cells]
+                if 'email' in headers:
+                    column = headers.index('email')
+                    continue
+            if column is not None:
+                raw = cells[column] if column < len(cells) else ''
+            else:
+                raw = next((cell for cell in cells if '@' in cell), cells[0])
+            rows.append((number, raw))
+        return rows
+    finally:
+        # Leave the upload open; Django closes it with the request
+        text.detach()
+
+
+def import_rows(form, rows):
+    """
+    Add invitees in batches: normalize and dedupe in memory, look up which
+    addresses are already invited, then one bulk INSERT per batch.
+    Returns (results, counts) with one result per row:
+    {'row', 'email', 'status': added | exists | duplicate | invalid}.
+    """
+    results, seen = [], set()
+    pending = []  # (result, email) awaiting a batch
+    for number, raw in rows:
+        email = normalize_email(raw)
+        result = {'row': number, 'email': email or raw}
+        results.append(result)
+        if email is None:
+            result['status'] = 'invalid'
+        elif email in seen:
+            result['status'] = 'duplicate'
+        else:
+            seen.add(email)
+            pending.append((result, email))
+
+    for start in range(0, len(pending), BATCH_SIZE):
+        batch = pending[start:start + BATCH_SIZE]
+        existing = set(
+            form.invitees.filter(email_normalized__in=[email for _, email in batch])
+            .values_list('email_normalized', flat=True)
+        )
+        new = []
+        for result, email in batch:
+            if email in existing:
+                result['status'] = 'exists'
+            else:
+                result['status'] = 'added'
+                new.append(FormInvitee(form=form, email=email, email_normalized=email))
+        # ignore_conflicts covers a concurrent import adding the same address
+        FormInvitee.objects.bulk_create(new, ignore_conflicts=True)
+        if new:
+            invalidate_invitees(form.id)
+
+    counts = dict.fromkeys(('added', 'exists', 'duplicate', 'invalid'), 0)
+    for result in results:
+        counts[result['status']] += 1
+    return results, counts
+
+
+def queue_import(form, rows, user=None):
+    return InviteeImport.objects.create(
+        form=form,
+        requested_by=user if user and user.is_authenticated else None,
+        rows=[list(row) for row in rows],
+        counts={'rows': len(rows)},
+    )
+
+
+def process_pending(batch_size=1):
+    """
+    Run queued invitee imports. Returns the number processed.
+    """
+    jobs = _claim(batch_size)
+    for job in jobs:
+        try:
+            results, counts = import_rows(job.form, job.rows)
+        except Exception as e:
+            job.status = 'failed'
+            job.error = f"{type(e).__name__}: {e}"
+        else:
+            job.status = 'done'
+            job.results, job.counts = results, {**counts, 'rows': len(results)}
+            job.rows = []
+        job.finished_at = timezone.now()
+        job.save(update_fields=['status', 'error', 'results', 'counts', 'rows', 'finished_at'])
+    return len(jobs)
+
+
+def _claim(batch_size):
+    now = timezone.now()
+    with transaction.atomic():
+        jobs = list(
+            InviteeImport.objects.select_for_update(skip_locked=True, of=('self',))
+            .filter(
+                Q(status='pending')
+                | Q(status='running', claimed_at__lt=now - timedelta(seconds=CLAIM_LEASE))
+            )
+            .select_related('form')
+            .order_by('created_at')[:batch_size]
+        )
+        InviteeImport.objects.filter(id__in=[job.id for job in jobs]).update(status='running', claimed_at=now)
+    return jobs
@@ -0,0 +1,117 @@
+"""
+Logging plumbing: request ids, per-logger sampling, JSON lines, and a
+queue-backed handler so request threads never block on log I/O. Wired up
+by the LOGGING setting.
+"""
+import contextvars
+import copy
+import json
+import logging
+import queue
+import random
+import sys
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+
+from django.conf import settings
+
+request_id = contextvars.ContextVar('request_id', default=None)
+
+# LogRecord attributes that aren't `extra=` fields
+_RECORD_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime', 'request_id'}
+
+
+class RequestIDFilter(logging.Filter):
+    """
+    Stamp records with the current request id (None outside a request).
+    """
+    def filter(self, record):
+        if getattr(record, 'request_id', None) is None:
+            # django.request logs 4xx/5xx after the middleware has returned
+            record.request_id = request_id.get() or getattr(getattr(record, 'request', None), 'request_id', None)
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Keep only a fraction of DEBUG/INFO records per logger, from the
+    LOG_SAMPLE_RATES setting ({'forms.views': 0.1, ...}; the longest matching
+    logger prefix wins). Warnings and errors are always kept.
+    """
+    def __init__(self, rates=None):
+        super().__init__()
+        rates = getattr(settings, 'LOG_SAMPLE_RATES', {}) if rates is None else rates
+        self.rates = sorted(rates.items(), key=lambda item: len(item[0]), reverse=True)
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING or not self.rates:
+            return True
+        for prefix, rate in self.rates:
+            if record.name == prefix or record.name.startswith(prefix + '.'):
+                return rate >= 1 or random.random() < rate
+        return True
+
+
+class JSONFormatter(logging.Formatter):
+    """
+    One JSON object per line: time, level, logger, message, request id, any
+    `extra=` fields, and the traceback if there is one.
+    """
+    def format(self, record):
+        entry = {
+            'time': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'request_id': getattr(record, 'request_id', None),
+        }
+        entry.update({key: value for key, value in vars(record).items() if key not in _RECORD_ATTRS})
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry['exc'] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class AsyncHandler(QueueHandler):
+    """
+    Hands records to a background QueueListener that formats and writes them
+    to `stream`, so the caller only pays for a copy and a queue put. When the
+    queue is full records are dropped (and counted) rather than blocking.
+
+    Filters attached here run in the calling thread (request ids, sampling);
+    the formatter is applied by the listener.
+    """
+    def __init__(self, stream=None, queue_size=10000):
+        super().__init__(queue.Queue(queue_size))
+        self.dropped = 0
+        self.target = logging.StreamHandler(stream or sys.stderr)
+        self.listener = QueueListener(self.queue, self.target, respect_handler_level=False)
+        self.listener.start()
+        self.running = True
+
+    def setFormatter(self, fmt):
+        self.target.setFormatter(fmt)
+
+    def prepare(self, record):
+        # Render the message and traceback now (args may be mutated later),
+        # but leave formatting to the listener thread
+        record = copy.copy(record)
+        record.msg, record.args = record.getMessage(), None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def close(self):
+        # Called by logging.shutdown() at exit: drain the queue first
+        if self.running:
+            self.running = False
+            self.listener.stop()
+        super().close()
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
@@ -0,0 +1,63 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from forms import benchmarks
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark the hot API endpoints in-process against a freshly seeded test "
+        "database and print (or write) JSON results. With --compare, fail on regressions."
+    )
+
+    def add_arguments(self, parser):
+        for name, default in benchmarks.DEFAULT_SCALE.items():
+            parser.add_argument(f'--{name}', type=int, default=default, help=f"Seeded {name} (default {default})")
+        parser.add_argument('--iterations', type=int, default=20, help="Timed requests per endpoint")
+        parser.add_argument('--warmup', type=int, default=3, help="Untimed requests per endpoint first")
+        parser.add_argument('--only', nargs='+', metavar='SCENARIO', help="Run only these scenarios")
+        parser.add_argument('--output', help="Write the JSON results to this file")
+        parser.add_argument('--compare', metavar='BASELINE', help="JSON results of an earlier run to compare against")
+        parser.add_argument('--threshold', type=float, default=0.2,
+                            help="Allowed slowdown / memory growth as a fraction (default 0.2)")
+        parser.add_argument('--keepdb', action='store_true', help="Keep the test database between runs")
+        parser.add_argument('--local-cache', action='store_true',
+                            help="Use an isolated local-memory cache instead of the configured CACHES "
+                                 "(hides the cache's round-trip cost)")
+
+    def handle(self, *args, **options):
+        scale = {name: options[name] for name in benchmarks.DEFAULT_SCALE}
+        baseline = benchmarks.load(options['compare']) if options['compare'] else None
+
+        # 1. Throwaway database and cache key prefix so real data is never touched
+        with benchmarks.test_environment(options['keepdb'], options['local_cache']):
+            report = benchmarks.run(scale, options['iterations'], options['warmup'], options['only'])
+
+        # 2. Results
+        document = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as fh:
+                fh.write(document + '\n')
+            self.print_table(report)
+        else:
+            self.stdout.write(document)
+
+        failed = [name for name, result in report['results'].items() if not result['ok']]
+        for name in failed:
+            self.stderr.write(f"{name}: unexpected status {report['results'][name]['status']}")
+
+        # 3. Regressions against the baseline
+        regressions = benchmarks.compare(baseline, report, options['threshold']) if baseline else []
+        for message in regressions:
+            self.stderr.write(f"Regression: {message}")
+        if failed or regressions:
+            raise CommandError(f"{len(failed)} failed scenario(s), {len(regressions)} regression(s).")
+
+    def print_table(self, report):
+        self.stdout.write(f"{'scenario':<26}{'p50 ms':>10}{'p95 ms':>10}{'queries':>9}{'peak KiB':>10}")
+        for name, result in report['results'].items():
+            self.stdout.write(
+                f"{name:<26}{result['latency_ms']['p50']:>10.2f}{result['latency_ms']['p95']:>10.2f}"
+                f"{result['queries']['median']:>9}{result['peak_memory_kb'] or 0:>10.1f}"
+            )
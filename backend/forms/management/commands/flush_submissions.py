@@ -0,0 +1,33 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from forms.submissions import FLUSH_SIZE, flush_pending
+
+
+class Command(BaseCommand):
+    help = (
+        "Group-commit write-behind submissions (SUBMISSION_WRITE_BEHIND) into responses. "
+        "Submissions left by a crashed run are still pending and are replayed."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=FLUSH_SIZE,
+                            help=f"Submissions per transaction (default SUBMISSION_FLUSH_SIZE, {FLUSH_SIZE})")
+        parser.add_argument('--interval', type=float, default=getattr(settings, 'SUBMISSION_FLUSH_INTERVAL', 1.0),
+                            help="Seconds to wait after a partial batch (default SUBMISSION_FLUSH_INTERVAL)")
+        parser.add_argument('--once', action='store_true', help="Flush what is pending now and exit")
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        while True:
+            flushed = flush_pending(batch_size)
+            if flushed:
+                self.stdout.write(f"Flushed {flushed} submission(s)")
+            if flushed == batch_size:
+                # Likely more waiting: group-commit again straight away
+                continue
+            if options['once']:
+                return
+            time.sleep(options['interval'])
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from forms.blobs import GC_GRACE, collect_garbage, recount_references
+
+
+class Command(BaseCommand):
+    help = "Delete stored upload blobs that no form image or file answer references."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--grace', type=int, default=GC_GRACE, help="Keep unreferenced blobs uploaded within this many seconds")
+        parser.add_argument('--recount', action='store_true', help="Rebuild reference counts from forms and answers first")
+        parser.add_argument('--dry-run', action='store_true', help="Report what would be deleted without deleting it")
+
+    def handle(self, *args, **options):
+        if options['recount']:
+            refs = recount_references()
+            self.stdout.write(f"Recounted references to {len(refs)} blob(s)")
+        count, freed = collect_garbage(grace=options['grace'], dry_run=options['dry_run'])
+        verb = "Would delete" if options['dry_run'] else "Deleted"
+        self.stdout.write(f"{verb} {count} blob(s), {freed} bytes")
@@ -0,0 +1,65 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from forms import benchmarks
+
+
+class Command(BaseCommand):
+    help = (
+        "Load-test response submission in-process through the ASGI handler: bursts of "
+        "concurrent submissions to POST /api/responses/ and to the async "
+        "POST /api/forms/<id>/submit/, against a freshly seeded test database. With "
+        "--write-behind, also buffered submissions and per-request vs group commits."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 10, 50],
+                            help="Concurrent requests in flight, one run per level (default 1 10 50)")
+        parser.add_argument('--requests', type=int, default=200, help="Submissions per run (default 200)")
+        parser.add_argument('--write-behind', type=int, nargs='*', metavar='FLUSH_SIZE',
+                            help="Also run the submit endpoint in write-behind mode and compare per-request "
+                                 "commits with group commits of these flush sizes (default 50 500)")
+        parser.add_argument('--output', help="Write the JSON results to this file")
+        parser.add_argument('--keepdb', action='store_true', help="Keep the test database between runs")
+        parser.add_argument('--local-cache', action='store_true',
+                            help="Use an isolated local-memory cache instead of the configured CACHES "
+                                 "(hides the cache's round-trip cost)")
+
+    def handle(self, *args, **options):
+        with benchmarks.test_environment(options['keepdb'], options['local_cache'], threaded=True):
+            flush_sizes = options['write_behind']
+            if flush_sizes == []:
+                flush_sizes = [50, 500]
+            report = benchmarks.submission_load_test(options['concurrency'], options['requests'], flush_sizes)
+
+        document = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as fh:
+                fh.write(document + '\n')
+        else:
+            self.stdout.write(document)
+
+        self.stdout.write(f"{'endpoint':<24}{'conc':>6}{'req/s':>9}{'p50 ms':>10}{'p95 ms':>10}  status")
+        for name, runs in report['results'].items():
+            for result in runs:
+                self.stdout.write(
+                    f"{name:<24}{result['concurrency']:>6}{result['throughput_rps']:>9.1f}"
+                    f"{result['latency_ms']['p50']:>10.2f}{result['latency_ms']['p95']:>10.2f}  {result['status']}"
+                )
+
+        modes = report.get('commit_modes', {})
+        if modes:
+            self.stdout.write(f"\n{'commit mode':<24}{'seconds':>9}{'subm/s':>9}{'queries':>9}")
+            for name, result in modes.items():
+                self.stdout.write(
+                    f"{name:<24}{result['seconds']:>9.3f}{result['submissions_per_s']:>9.1f}{result['queries']:>9}"
+                )
+
+        expected = {'async_submit_buffered': {'202'}}
+        failed = [
+            f"{name} x{result['concurrency']}" for name, runs in report['results'].items()
+            for result in runs if set(result['status']) != expected.get(name, {'201'})
+        ]
+        if failed:
+            raise CommandError(f"Non-201 responses in: {', '.join(failed)}")
@@ -0,0 +1,25 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from forms.images import process_pending
+
+
+class Command(BaseCommand):
+    help = "Build resized AVIF/WebP variants for uploaded form images."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=10, help="Images claimed per batch")
+        parser.add_argument('--interval', type=float, default=5.0, help="Seconds to sleep when the queue is empty")
+        parser.add_argument('--once', action='store_true', help="Process what is queued now and exit")
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        while True:
+            processed = process_pending(batch_size)
+            if processed:
+                self.stdout.write(f"Processed {processed} image(s)")
+                continue
+            if options['once']:
+                return
+            time.sleep(options['interval'])
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from forms.uploads import SESSION_IDLE_TIMEOUT, purge_sessions
+
+
+class Command(BaseCommand):
+    help = "Delete chunked upload sessions (and their part files) abandoned before finalize."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hours', type=float, default=SESSION_IDLE_TIMEOUT / 3600,
+                            help="Purge sessions idle for longer than this (default UPLOAD_SESSION_IDLE_TIMEOUT)")
+
+    def handle(self, *args, **options):
+        purged = purge_sessions(options['hours'] * 3600)
+        self.stdout.write(f"Purged {purged} upload session(s)")
@@ -0,0 +1,25 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from forms.notifications import deliver_pending
+
+
+class Command(BaseCommand):
+    help = "Drain the notification outbox, sending submission e-mails in batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100, help="Notifications sent per SMTP connection")
+        parser.add_argument('--interval', type=float, default=5.0, help="Seconds to sleep when the outbox is empty")
+        parser.add_argument('--once', action='store_true', help="Drain what is due now and exit")
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        while True:
+            processed = deliver_pending(batch_size)
+            if processed:
+                self.stdout.write(f"Processed {processed} notification(s)")
+                continue
+            if options['once']:
+                return
+            time.sleep(options['interval'])
@@ -0,0 +1,297 @@
+import contextvars
+import hashlib
+import heapq
+import logging
+import random
+import re
+import time
+import uuid
+from collections import Counter
+from contextlib import contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from whitenoise.middleware import WhiteNoiseMiddleware
+
+from .log import request_id
+
+logger = logging.getLogger(__name__)
+
+# Incoming X-Request-ID values are only trusted if they look like an id
+_REQUEST_ID_RE = re.compile(r'^[A-Za-z0-9._-]{1,64}$')
+
+# Placeholder lists ("IN (%s, %s, ...)", multi-row VALUES) collapse to one
+# fingerprint whatever their length; literals are masked in case raw SQL has any.
+_IN_LIST_RE = re.compile(r'\((?:\s*%s\s*,)+\s*%s\s*\)')
+_VALUES_RE = re.compile(r'(VALUES\s*\(.*?\))(?:\s*,\s*\(.*?\))+', re.IGNORECASE | re.DOTALL)
+_LITERAL_RE = re.compile(r"'(?:[^']|'')*'|\b\d+\b")
+_SPACE_RE = re.compile(r'\s+')
+
+
+def fingerprint(sql):
+    """
+    SQL with parameters, literals and list lengths masked, so the same query
+    issued for different rows (the N+1 pattern) maps to the same string.
+    """
+    sql = _VALUES_RE.sub(r'\1, ...', sql)
+    sql = _IN_LIST_RE.sub('(...)', sql)
+    sql = _LITERAL_RE.sub('?', sql)
+    return _SPACE_RE.sub(' ', sql).strip()
+
+
+class RequestIDMiddleware:
+    """
+    Give every request an id (the caller's X-Request-ID if it sent a sane one)
+    for log records and the X-Request-ID response header.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        token = self.start(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            request_id.reset(token)
+        return self.finish(request, response)
+
+    async def __acall__(self, request):
+        token = self.start(request)
+        try:
+            response = await self.get_response(request)
+        finally:
+            request_id.reset(token)
+        return self.finish(request, response)
+
+    def start(self, request):
+        incoming = request.headers.get('X-Request-ID', '')
+        request.request_id = incoming if _REQUEST_ID_RE.match(incoming) else uuid.uuid4().hex
+        return request_id.set(request.request_id)
+
+    def finish(self, request, response):
+        response['X-Request-ID'] = request.request_id
+        return response
+
+
+# The recorder for the current request. A context variable rather than a
+# wrapper per connection: connections are per thread, and an async view's
+# queries run on the connections of the threads sync_to_async picks, which
+# inherit the request's context.
+_active_recorder = contextvars.ContextVar('query_recorder', default=None)
+
+
+def _record_query(execute, sql, params, many, context):
+    recorder = _active_recorder.get()
+    if recorder is None:
+        return execute(sql, params, many, context)
+    return recorder(execute, sql, params, many, context)
+
+
+def _install(connection):
+    # First in the list: execute_wrapper() blocks pop the last wrapper on exit
+    if _record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, _record_query)
+
+
+@receiver(connection_created)
+def _install_on_connect(sender, connection, **kwargs):
+    _install(connection)
+
+
+class QueryRecorder:
+    """
+    connection.execute_wrapper() callable that counts and times every
+    statement, keeping the slowest few and a count per fingerprint.
+    """
+    def __init__(self, keep_slowest=3):
+        self.count = 0
+        self.duration = 0.0
+        self.keep_slowest = keep_slowest
+        self.slowest = []  # min-heap of (duration, sequence, sql)
+        self.fingerprints = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - start
+            self.count += 1
+            self.duration += elapsed
+            self.fingerprints[fingerprint(sql)] += 1
+            entry = (elapsed, self.count, sql)
+            if len(self.slowest) < self.keep_slowest:
+                heapq.heappush(self.slowest, entry)
+            elif elapsed > self.slowest[0][0]:
+                heapq.heapreplace(self.slowest, entry)
+
+    @contextmanager
+    def recording(self):
+        """
+        Record every statement run in this context (threads entered through
+        sync_to_async included) on any configured database.
+        """
+        for alias in connections:
+            _install(connections[alias])
+        token = _active_recorder.set(self)
+        try:
+            yield self
+        finally:
+            _active_recorder.reset(token)
+
+    def duplicates(self, threshold):
+        return [(sql, count) for sql, count in self.fingerprints.most_common() if count >= threshold]
+
+    def stats(self, duplicate_threshold):
+        return {
+            'queries': self.count,
+            'db_ms': round(self.duration * 1000, 3),
+            'slowest': [
+                {'ms': round(elapsed * 1000, 3), 'sql': sql[:500]}
+                for elapsed, _, sql in sorted(self.slowest, reverse=True)
+            ],
+            'duplicates': [
+                {'count': count, 'fingerprint': hashlib.md5(sql.encode()).hexdigest()[:12], 'sql': sql[:500]}
+                for sql, count in self.duplicates(duplicate_threshold)
+            ],
+        }
+
+
+class QueryInstrumentationMiddleware:
+    """
+    Records query count, DB time, the slowest statements and repeated query
+    fingerprints (likely N+1s) for a sample of requests. Each sampled request
+    gets a Server-Timing header and one log line on the `forms.middleware`
+    logger (a warning when it repeats a query).
+
+    Settings: QUERY_INSTRUMENTATION (on/off), QUERY_INSTRUMENTATION_SAMPLE_RATE
+    (0.0-1.0), QUERY_SLOWEST_COUNT, QUERY_DUPLICATE_THRESHOLD.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'QUERY_INSTRUMENTATION', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.sample_rate = getattr(settings, 'QUERY_INSTRUMENTATION_SAMPLE_RATE', 1.0)
+        self.keep_slowest = getattr(settings, 'QUERY_SLOWEST_COUNT', 3)
+        self.duplicate_threshold = getattr(settings, 'QUERY_DUPLICATE_THRESHOLD', 3)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not self.sampled():
+            return self.get_response(request)
+
+        recorder = QueryRecorder(self.keep_slowest)
+        start = time.perf_counter()
+        with recorder.recording():
+            response = self.get_response(request)
+        return self.finish(request, response, recorder, start)
+
+    async def __acall__(self, request):
+        if not self.sampled():
+            return await self.get_response(request)
+
+        recorder = QueryRecorder(self.keep_slowest)
+        start = time.perf_counter()
+        with recorder.recording():
+            response = await self.get_response(request)
+        return self.finish(request, response, recorder, start)
+
+    def sampled(self):
+        return self.sample_rate >= 1 or random.random() < self.sample_rate
+
+    def finish(self, request, response, recorder, start):
+        elapsed = time.perf_counter() - start
+        response['Server-Timing'] = self.server_timing(recorder, elapsed)
+        if getattr(response, 'streaming', False):
+            # Streamed bodies (export_csv) query while they are sent, after
+            # the headers; log once the stream is exhausted to include them
+            record = self.record_async_stream if getattr(response, 'is_async', False) else self.record_stream
+            response.streaming_content = record(response.streaming_content, recorder, request, response, start)
+        else:
+            self.log(request, response, recorder, elapsed)
+        return response
+
+    def record_stream(self, content, recorder, request, response, start):
+        with recorder.recording():
+            yield from content
+        self.log(request, response, recorder, time.perf_counter() - start)
+
+    async def record_async_stream(self, content, recorder, request, response, start):
+        with recorder.recording():
+            async for chunk in content:
+                yield chunk
+        self.log(request, response, recorder, time.perf_counter() - start)
+
+    def server_timing(self, recorder, elapsed):
+        metrics = [
+            f'db;dur={recorder.duration * 1000:.3f};desc="{recorder.count} queries"',
+            f'app;dur={elapsed * 1000:.3f}',
+        ]
+        repeated = len(recorder.duplicates(self.duplicate_threshold))
+        if repeated:
+            metrics.append(f'dupes;desc="{repeated} repeated queries"')
+        return ', '.join(metrics)
+
+    def log(self, request, response, recorder, elapsed):
+        stats = recorder.stats(self.duplicate_threshold)
+        stats.update({
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'total_ms': round(elapsed * 1000, 3),
+        })
+        level = logging.WARNING if stats['duplicates'] else logging.INFO
+        logger.log(
+            level, "%s %s %s queries=%d db_ms=%.1f total_ms=%.1f duplicates=%d",
+            request.method, request.path, response.status_code,
+            stats['queries'], stats['db_ms'], stats['total_ms'], len(stats['duplicates']),
+            # Explicit, since a streamed response is logged after the request's context ends
+            extra={'query_stats': stats, 'request_id': getattr(request, 'request_id', None)},
+        )
+
+
+class StaticFilesMiddleware(WhiteNoiseMiddleware):
+    """
+    WhiteNoise, able to sit in an async middleware chain. WhiteNoise 6 is
+    sync-only, and a single sync-only middleware switches every request under
+    ASGI to sync at that point, so async views would hold a thread for the
+    whole request like sync ones.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response=None, settings=settings):
+        super().__init__(get_response, settings)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return super().__call__(request)
+
+    async def __acall__(self, request):
+        if self.autorefresh:
+            static_file = await sync_to_async(self.find_file)(request.path_info)
+        else:
+            static_file = self.files.get(request.path_info)
+        if static_file is not None:
+            return await sync_to_async(self.serve)(static_file, request)
+        return await self.get_response(request)
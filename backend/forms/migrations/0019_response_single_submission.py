@@ -0,0 +1,22 @@
+# Generated by Django 4.2.30 on 2026-10-17 22:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('forms', '0018_notificationoutbox'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='response',
+            name='single_submission',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+        migrations.AddConstraint(
+            model_name='response',
+            constraint=models.UniqueConstraint(condition=models.Q(('single_submission', True)), fields=('form', 'respondent'), name='unique_single_submission'),
+        ),
+    ]
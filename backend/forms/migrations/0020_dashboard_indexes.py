@@ -0,0 +1,25 @@
+# Generated by Django 4.2.30 on 2026-10-17 22:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('forms', '0019_response_single_submission'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='form',
+            index=models.Index(fields=['-created_at', '-id'], name='form_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='formcollaborator',
+            index=models.Index(fields=['user', 'form'], name='collaborator_user_form_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='response',
+            index=models.Index(fields=['respondent', 'form'], name='response_respondent_form_idx'),
+        ),
+    ]
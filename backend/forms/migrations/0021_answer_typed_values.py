@@ -0,0 +1,59 @@
+# Generated by Django 4.2.30 on 2026-10-17 22:36
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.db.models.functions.text
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('forms', '0020_dashboard_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='answer',
+            name='value_bool',
+            field=models.BooleanField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='answer',
+            name='value_datetime',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='answer',
+            name='value_number',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='answer',
+            name='value_option',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='answers', to='forms.option'),
+        ),
+        migrations.AddIndex(
+            model_name='answer',
+            index=models.Index(fields=['response', 'question'], name='answer_response_question_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='answer',
+            index=models.Index(fields=['question', 'value_number'], name='answer_question_number_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='answer',
+            index=models.Index(fields=['question', 'value_datetime'], name='answer_question_datetime_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='answer',
+            index=models.Index(fields=['question', 'value_bool'], name='answer_question_bool_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='answer',
+            index=models.Index(fields=['question', 'value_option'], name='answer_question_option_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='answer',
+            index=models.Index(models.F('question'), django.db.models.functions.text.Left('value', 255), name='answer_question_value_idx'),
+        ),
+    ]
@@ -0,0 +1,100 @@
+from datetime import datetime, time
+
+from django.db import migrations
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+# A frozen copy of forms.answers.typed_values as of this migration, so later
+# changes to the live module can't change what the backfill does.
+NUMBER_TYPES = ('numeric', 'slider', 'rating', 'linear_scale', 'nps')
+DATETIME_TYPES = ('date', 'datetime')
+BOOLEAN_TYPES = ('boolean',)
+OPTION_TYPES = ('radio', 'dropdown')
+
+TYPED_FIELDS = ['value_number', 'value_datetime', 'value_bool', 'value_option_id']
+
+TRUE_VALUES = ('yes', 'true', '1')
+FALSE_VALUES = ('no', 'false', '0')
+
+BATCH_SIZE = 2000
+
+
+def typed_values(question_type, value, options=()):
+    typed = dict.fromkeys(TYPED_FIELDS)
+    if value is None:
+        return typed
+    value = str(value).strip()
+    if not value:
+        return typed
+
+    if question_type in NUMBER_TYPES:
+        try:
+            number = float(value)
+        except ValueError:
+            return typed
+        if number == number and abs(number) != float('inf'):
+            typed['value_number'] = number
+    elif question_type in DATETIME_TYPES:
+        typed['value_datetime'] = parse_answer_datetime(value)
+    elif question_type in BOOLEAN_TYPES:
+        if value.lower() in TRUE_VALUES:
+            typed['value_bool'] = True
+        elif value.lower() in FALSE_VALUES:
+            typed['value_bool'] = False
+    elif question_type in OPTION_TYPES:
+        typed['value_option_id'] = next((opt.id for opt in options if opt.text == value), None)
+    return typed
+
+
+def parse_answer_datetime(value):
+    try:
+        parsed = parse_datetime(value)
+        if parsed is None:
+            day = parse_date(value)
+            if day is None:
+                return None
+            parsed = datetime.combine(day, time.min)
+    except ValueError:
+        return None
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+def backfill(apps, schema_editor):
+    Answer = apps.get_model('forms', 'Answer')
+    Option = apps.get_model('forms', 'Option')
+
+    answers = (
+        Answer.objects
+        .filter(question__question_type__in=NUMBER_TYPES + DATETIME_TYPES + BOOLEAN_TYPES + OPTION_TYPES)
+        .exclude(value__isnull=True).exclude(value='')
+        .select_related('question')
+        .order_by('id')
+    )
+    options = {}
+    for opt in Option.objects.filter(question__question_type__in=OPTION_TYPES).only('id', 'text', 'question_id'):
+        options.setdefault(opt.question_id, []).append(opt)
+
+    batch = []
+    for answer in answers.iterator(chunk_size=BATCH_SIZE):
+        typed = typed_values(answer.question.question_type, answer.value, options.get(answer.question_id, ()))
+        for field, value in typed.items():
+            setattr(answer, field, value)
+        batch.append(answer)
+        if len(batch) >= BATCH_SIZE:
+            Answer.objects.bulk_update(batch, TYPED_FIELDS)
+            batch = []
+    if batch:
+        Answer.objects.bulk_update(batch, TYPED_FIELDS)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('forms', '0021_answer_typed_values'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
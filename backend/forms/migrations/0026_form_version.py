@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-17 22:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('forms', '0025_storedblob_variants'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='form',
+            name='version',
+            field=models.PositiveIntegerField(default=1, editable=False),
+        ),
+    ]
@@ -0,0 +1,17 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('forms', '0027_inviteeimport'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='forminvitee',
+            name='email_normalized',
+            field=models.CharField(default='', editable=False, max_length=254),
+            preserve_default=False,
+        ),
+    ]
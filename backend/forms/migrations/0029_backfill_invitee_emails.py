@@ -0,0 +1,37 @@
+from django.db import migrations
+
+BATCH_SIZE = 2000
+
+
+def backfill(apps, schema_editor):
+    FormInvitee = apps.get_model('forms', 'FormInvitee')
+
+    # Addresses that differed only in case or whitespace become duplicates;
+    # keep the earliest invite of each.
+    seen, duplicates, batch = set(), [], []
+    for invitee in FormInvitee.objects.order_by('id').iterator(chunk_size=BATCH_SIZE):
+        invitee.email_normalized = invitee.email.strip().lower()
+        key = (invitee.form_id, invitee.email_normalized)
+        if key in seen:
+            duplicates.append(invitee.id)
+            continue
+        seen.add(key)
+        batch.append(invitee)
+        if len(batch) >= BATCH_SIZE:
+            FormInvitee.objects.bulk_update(batch, ['email_normalized'])
+            batch = []
+    if batch:
+        FormInvitee.objects.bulk_update(batch, ['email_normalized'])
+    for start in range(0, len(duplicates), BATCH_SIZE):
+        FormInvitee.objects.filter(id__in=duplicates[start:start + BATCH_SIZE]).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('forms', '0028_forminvitee_email_normalized'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
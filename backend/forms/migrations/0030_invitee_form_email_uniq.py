@@ -0,0 +1,19 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('forms', '0029_backfill_invitee_emails'),
+    ]
+
+    operations = [
+        migrations.AlterUniqueTogether(
+            name='forminvitee',
+            unique_together=set(),
+        ),
+        migrations.AddConstraint(
+            model_name='forminvitee',
+            constraint=models.UniqueConstraint(fields=('form', 'email_normalized'), name='invitee_form_email_uniq'),
+        ),
+    ]
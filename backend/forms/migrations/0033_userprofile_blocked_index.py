@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-17 23:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('forms', '0032_create_cache_table'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='userprofile',
+            index=models.Index(condition=models.Q(('platform_status', 'blocked')), fields=['user'], name='profile_blocked_idx'),
+        ),
+    ]
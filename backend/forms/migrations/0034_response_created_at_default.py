@@ -0,0 +1,19 @@
+# Generated by Django 4.2.30 on 2026-10-17 23:47
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('forms', '0033_userprofile_blocked_index'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='response',
+            name='created_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-18 00:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('forms', '0034_response_created_at_default'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='response',
+            index=models.Index(fields=['form', '-created_at', '-id'], name='response_form_created_idx'),
+        ),
+    ]
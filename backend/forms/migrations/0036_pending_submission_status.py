@@ -0,0 +1,27 @@
+# Generated by Django 4.2.30 on 2026-10-18 00:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('forms', '0035_response_form_created_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pendingsubmission',
+            name='rejected_reason',
+            field=models.CharField(blank=True, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='pendingsubmission',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('rejected', 'Rejected')], default='pending', max_length=20),
+        ),
+        migrations.AddIndex(
+            model_name='pendingsubmission',
+            index=models.Index(condition=models.Q(('status', 'pending')), fields=['id'], name='pending_submission_queue_idx'),
+        ),
+    ]
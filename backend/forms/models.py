@@ -1,5 +1,9 @@
+import uuid
+
 from django.db import models
 from django.conf import settings
+from django.db.models.functions import Left
+from django.utils import timezone
 
 class Form(models.Model):
     title = models.CharField(max_length=255)
@@ -23,6 +27,8 @@ class Form(models.Model):
 
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # Bumped by every write to the form or its sections/questions/options (see cache.touch_forms)
+    version = models.PositiveIntegerField(default=1, editable=False)
     published_at = models.DateTimeField(blank=True, null=True, help_text="Date when the form was first published")
     slug = models.SlugField(max_length=255, unique=True, blank=True, null=True, help_text="Custom URL identifier")
     
@@ -38,10 +44,22 @@ class Form(models.Model):
             ("view_responses", "Can view responses"),
             ("export_responses", "Can export responses"),
         ]
+        indexes = [
+            # Dashboard ordering / cursor pagination
+            models.Index(fields=['-created_at', '-id'], name='form_created_idx'),
+        ]
 
     def __str__(self):
         return self.title
 
+    def accepts_responses(self, at=None):
+        """
+        Whether a submission made at `at` (default: now) is taken: the form is
+        switched on and had not expired by then. Checked by every submit path.
+        """
+        at = at or timezone.now()
+        return self.is_active and not (self.expiry_at and self.expiry_at <= at)
+
 class Section(models.Model):
     form = models.ForeignKey(Form, on_delete=models.CASCADE, related_name='sections')
     title = models.CharField(max_length=255)
@@ -110,8 +128,28 @@ class Option(models.Model):
 class Response(models.Model):
     form = models.ForeignKey(Form, on_delete=models.CASCADE, related_name='responses')
     respondent = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name='responses')
-    created_at = models.DateTimeField(auto_now_add=True)
+    # A default rather than auto_now_add, so flushed write-behind submissions
+    # keep the time they were accepted
+    created_at = models.DateTimeField(default=timezone.now, editable=False)
     updated_at = models.DateTimeField(auto_now=True)
+    # Set when the form allowed one response per user at submission time
+    single_submission = models.BooleanField(default=False, editable=False)
+
+    class Meta:
+        indexes = [
+            # "Forms I responded to": index-only scan for the dashboard UNION
+            models.Index(fields=['respondent', 'form'], name='response_respondent_form_idx'),
+            # Keyset order of a form's responses (cursor pages, CSV export, latest response)
+            models.Index(fields=['form', '-created_at', '-id'], name='response_form_created_idx'),
+        ]
+        constraints = [
+            # Enforces allow_multiple_responses=False under concurrent submits
+            models.UniqueConstraint(
+                fields=['form', 'respondent'],
+                condition=models.Q(single_submission=True),
+                name='unique_single_submission',
+            ),
+        ]
 
     def __str__(self):
         return f"Response to {self.form.title} (#{self.id})"
@@ -121,6 +159,44 @@ class Answer(models.Model):
     question = models.ForeignKey(Question, on_delete=models.CASCADE, related_name='answers')
     value = models.TextField(blank=True, null=True)
 
+    # Typed copies of `value`, filled from the question type when the answer
+    # is saved (see forms.answers.typed_values) so filters and aggregates
+    # can use indexed comparisons instead of casting text.
+    value_number = models.FloatField(blank=True, null=True)
+    value_datetime = models.DateTimeField(blank=True, null=True)
+    value_bool = models.BooleanField(blank=True, null=True)
+    value_option = models.ForeignKey(Option, on_delete=models.SET_NULL, blank=True, null=True, related_name='answers')
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['response', 'question'], name='answer_response_question_idx'),
+            models.Index(fields=['question', 'value_number'], name='answer_question_number_idx'),
+            models.Index(fields=['question', 'value_datetime'], name='answer_question_datetime_idx'),
+            models.Index(fields=['question', 'value_bool'], name='answer_question_bool_idx'),
+            models.Index(fields=['question', 'value_option'], name='answer_question_option_idx'),
+            # Prefix only: long_text answers can exceed the btree row size limit
+            models.Index('question', Left('value', 255), name='answer_question_value_idx'),
+        ]
+
+    def fill_typed_values(self, options=None):
+        """
+        Set the typed value columns from `value` and the question type.
+        Pass the question's options to avoid a query for choice questions.
+        """
+        from .answers import OPTION_TYPES, typed_values
+        question_type = self.question.question_type
+        if options is None:
+            options = self.question.options.all() if question_type in OPTION_TYPES else ()
+        for field, typed in typed_values(question_type, self.value, options).items():
+            setattr(self, field, typed)
+
+    def save(self, *args, **kwargs):
+        self.fill_typed_values()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'value' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'value_number', 'value_datetime', 'value_bool', 'value_option'}
+        super().save(*args, **kwargs)
+
     def __str__(self):
         return f"Ans to {self.question.id}: {self.value[:20]}"
 
@@ -136,6 +212,12 @@ class UserProfile(models.Model):
     is_platform_admin = models.BooleanField(default=False, help_text="Grant full platform access")
     roles = models.ManyToManyField('Role', blank=True, related_name='user_profiles')
 
+    class Meta:
+        indexes = [
+            # Polled by every worker for the revocation set (forms.revocation)
+            models.Index(fields=['user'], condition=models.Q(platform_status='blocked'), name='profile_blocked_idx'),
+        ]
+
     def __str__(self):
         return f"{self.user.username}'s Profile"
 
@@ -165,6 +247,10 @@ class FormCollaborator(models.Model):
     
     class Meta:
         unique_together = ('form', 'user')
+        indexes = [
+            # "Forms shared with me": index-only scan for the dashboard UNION
+            models.Index(fields=['user', 'form'], name='collaborator_user_form_idx'),
+        ]
 
     def __str__(self):
         return f"{self.user.username} as {self.role.name} on {self.form.title}"
@@ -199,11 +285,182 @@ class FormInvitee(models.Model):
     """
     form = models.ForeignKey(Form, on_delete=models.CASCADE, related_name='invitees')
     email = models.EmailField()
+    # Trimmed, lower-cased email; access checks and uniqueness use this column
+    email_normalized = models.CharField(max_length=254, editable=False)
     invited_at = models.DateTimeField(auto_now_add=True)
     # invited_by could be linked to User (optional)
 
     class Meta:
-        unique_together = ('form', 'email')
+        constraints = [
+            models.UniqueConstraint(fields=['form', 'email_normalized'], name='invitee_form_email_uniq'),
+        ]
+
+    def save(self, *args, **kwargs):
+        self.email_normalized = (self.email or '').strip().lower()
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return f"{self.email} invited to {self.form.title}"
+
+class InviteeImport(models.Model):
+    """
+    An invitee list too long to import inside the request. Rows wait here
+    until the import_invitees worker adds them; per-row results are kept
+    for the editor to fetch.
+    """
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+
+    form = models.ForeignKey(Form, on_delete=models.CASCADE, related_name='invitee_imports')
+    requested_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    # [[row number, raw value], ...]; emptied once imported
+    rows = models.JSONField(default=list, blank=True)
+    results = models.JSONField(default=list, blank=True)
+    counts = models.JSONField(default=dict, blank=True)
+    error = models.TextField(blank=True)
+    claimed_at = models.DateTimeField(blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'created_at']),
+        ]
+
+    def __str__(self):
+        return f"Invitee import #{self.id} for {self.form_id} ({self.status})"
+
+class NotificationOutbox(models.Model):
+    """
+    Submission e-mails waiting to be sent. Rows are written in the same
+    transaction as the Response and drained by the send_notifications
+    management command, so SMTP never runs inside a request.
+    """
+    KIND_CHOICES = [
+        ('creator', 'Notify Creator'),
+        ('respondent', 'Respondent Receipt'),
+    ]
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('sent', 'Sent'),
+        ('skipped', 'Skipped'),
+        ('failed', 'Failed'),
+    ]
+
+    response = models.ForeignKey(Response, on_delete=models.CASCADE, related_name='notifications')
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    anonymous_email = models.CharField(max_length=254, blank=True, null=True, help_text="respondent_email sent with the submission")
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        ordering = ['next_attempt_at']
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} notification for response #{self.response_id} ({self.status})"
+
+class PendingSubmission(models.Model):
+    """
+    A submission accepted in write-behind mode (SUBMISSION_WRITE_BEHIND):
+    one row, already validated, written instead of the Response and its
+    answers. The flush_submissions worker turns batches of them into
+    responses and deletes them in the same transaction, so a crash just
+    leaves them to be replayed. Rows the flush refuses (the form closed
+    since, or a repeat on a one-response form) stay behind as 'rejected'.
+    """
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('rejected', 'Rejected'),
+    ]
+
+    form = models.ForeignKey(Form, on_delete=models.CASCADE, related_name='pending_submissions')
+    respondent = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    # [{'question': id, 'value': text}, ...]
+    answers = models.JSONField(default=list)
+    respondent_email = models.CharField(max_length=254, blank=True, null=True)
+    # Becomes the Response's created_at
+    created_at = models.DateTimeField(auto_now_add=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    rejected_reason = models.CharField(max_length=255, blank=True)
+
+    class Meta:
+        indexes = [
+            # The flush queue; rejected rows are kept for inspection
+            models.Index(fields=['id'], condition=models.Q(status='pending'), name='pending_submission_queue_idx'),
+        ]
+
+    def __str__(self):
+        return f"Pending submission #{self.id} to form #{self.form_id}"
+
+class UploadSession(models.Model):
+    """
+    Resumable chunked upload. Chunks are appended to a part file on local
+    disk in order; finalizing streams the part file into media storage.
+    The id doubles as the upload token, so it is a random UUID.
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    owner = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, null=True, blank=True, related_name='upload_sessions')
+    filename = models.CharField(max_length=255)
+    size = models.BigIntegerField(blank=True, null=True, help_text="Total size declared by the client, if known")
+    received = models.BigIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Upload {self.filename} ({self.received} bytes)"
+
+class StoredBlob(models.Model):
+    """
+    Content-addressed upload. Files are stored once per SHA-256 and shared
+    by every form image or file answer that points at them; ref_count tracks
+    those references so the gc_blobs command can drop unused files.
+    """
+    sha256 = models.CharField(max_length=64, primary_key=True)
+    path = models.CharField(max_length=255)
+    size = models.BigIntegerField()
+    ref_count = models.IntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    # Touched on every re-upload so a blob about to be referenced isn't collected
+    last_uploaded_at = models.DateTimeField(default=timezone.now)
+
+    # Resized WebP/AVIF copies for branding images, made by the process_images worker
+    VARIANTS_STATUS_CHOICES = [
+        ('none', 'Not Requested'),
+        ('pending', 'Pending'),
+        ('processing', 'Processing'),
+        ('done', 'Done'),
+        ('skipped', 'Skipped'),
+        ('failed', 'Failed'),
+    ]
+    variants_status = models.CharField(max_length=20, choices=VARIANTS_STATUS_CHOICES, default='none')
+    variants_claimed_at = models.DateTimeField(blank=True, null=True)
+    width = models.PositiveIntegerField(blank=True, null=True)
+    height = models.PositiveIntegerField(blank=True, null=True)
+    # [{'path', 'width', 'height', 'type'}, ...]
+    variants = models.JSONField(default=list, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['ref_count', 'last_uploaded_at'], name='blob_gc_idx'),
+            models.Index(fields=['variants_status', 'variants_claimed_at'], name='blob_variants_idx'),
+        ]
+
+    @property
+    def url(self):
+        from django.core.files.storage import default_storage
+        return default_storage.url(self.path)
+
+    def __str__(self):
+        return f"{self.sha256[:12]} ({self.ref_count} refs)"
@@ -0,0 +1,194 @@
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.db.models import Prefetch
+from django.utils import timezone
+
+from .models import Answer, NotificationOutbox
+
+logger = logging.getLogger(__name__)
+
+# Retry schedule: RETRY_BACKOFF seconds, doubled per attempt, up to MAX_ATTEMPTS
+MAX_ATTEMPTS = getattr(settings, 'NOTIFICATION_MAX_ATTEMPTS', 5)
+RETRY_BACKOFF = getattr(settings, 'NOTIFICATION_RETRY_BACKOFF', 60)
+# How long a claimed batch is hidden from other workers before it is retried
+CLAIM_LEASE = getattr(settings, 'NOTIFICATION_CLAIM_LEASE', 300)
+
+
+def queue_notifications(response, anonymous_email=None):
+    """
+    Record the e-mails a new response should trigger. Call inside the
+    transaction that saves the response so both commit (or roll back) together.
+    """
+    NotificationOutbox.objects.bulk_create(notification_rows(response, anonymous_email))
+
+
+def notification_rows(response, anonymous_email=None):
+    """
+    Unsaved outbox rows for the e-mails `response` should trigger.
+    """
+    form = response.form
+    kinds = []
+    if form.notify_creator and form.creator_id:
+        kinds.append('creator')
+    if form.notify_respondent:
+        kinds.append('respondent')
+    return [
+        NotificationOutbox(response=response, kind=kind, anonymous_email=anonymous_email or None)
+        for kind in kinds
+    ]
+
+
+def deliver_pending(batch_size=100):
+    """
+    Send one batch of due notifications over a single SMTP connection.
+    Returns the number of rows processed.
+    """
+    batch = _claim(batch_size)
+    if not batch:
+        return 0
+
+    now = timezone.now()
+    connection = get_connection(fail_silently=False)
+    try:
+        connection.open()
+    except Exception as e:
+        logger.warning("mail connection failed", extra={'event': 'notifications.connect_failed', 'error': repr(e)})
+        for notification in batch:
+            _retry_later(notification, e, now)
+    else:
+        try:
+            for notification in batch:
+                # A row that can't be built (a bad template, a missing form)
+                # is retried and eventually failed like one that can't be sent
+                try:
+                    message = build_message(notification)
+                    if message is None:
+                        notification.status = 'skipped'
+                        continue
+                    connection.send_messages([message])
+                except Exception as e:
+                    logger.warning("notification send failed", extra={
+                        'event': 'notifications.send_failed', 'notification_id': notification.id, 'error': repr(e),
+                    })
+                    _retry_later(notification, e, now)
+                else:
+                    notification.status = 'sent'
+                    notification.sent_at = now
+                    notification.last_error = ''
+        finally:
+            connection.close()
+
+    NotificationOutbox.objects.bulk_update(batch, ['status', 'attempts', 'last_error', 'next_attempt_at', 'sent_at'])
+    logger.info("notification batch processed", extra={
+        'event': 'notifications.batch', 'processed': len(batch),
+        'sent': sum(1 for notification in batch if notification.status == 'sent'),
+    })
+    return len(batch)
+
+
+def _retry_later(notification, error, now):
+    notification.attempts += 1
+    notification.last_error = f"{type(error).__name__}: {error}"
+    if notification.attempts >= MAX_ATTEMPTS:
+        notification.status = 'failed'
+    else:
+        notification.next_attempt_at = now + timedelta(seconds=RETRY_BACKOFF * 2 ** (notification.attempts - 1))
+
+
+def _claim(batch_size):
+    # Push the claimed rows' next_attempt_at past the lease so concurrent
+    # workers skip them; if this worker dies they become due again.
+    with transaction.atomic():
+        ids = list(
+            NotificationOutbox.objects.select_for_update(skip_locked=True)
+            .filter(status='pending', next_attempt_at__lte=timezone.now())
+            .order_by('next_attempt_at')
+            .values_list('id', flat=True)[:batch_size]
+        )
+        if not ids:
+            return []
+        NotificationOutbox.objects.filter(id__in=ids).update(
+            next_attempt_at=timezone.now() + timedelta(seconds=CLAIM_LEASE)
+        )
+
+    return list(
+        NotificationOutbox.objects.filter(id__in=ids)
+        .select_related('response__form__creator', 'response__respondent')
+        .prefetch_related(Prefetch(
+            'response__answers',
+            queryset=Answer.objects.filter(question__question_type='email'),
+            to_attr='email_answers',
+        ))
+    )
+
+
+def build_message(notification):
+    """
+    Build the EmailMessage for an outbox row, or None if there is nobody to send it to.
+    """
+    response = notification.response
+    form = response.form
+
+    # Use a sensible from_email (required by some SMTP providers)
+    from_email = getattr(settings, 'DEFAULT_FROM_EMAIL', None)
+    if not from_email or from_email == 'webmaster@localhost':
+        from_email = getattr(settings, 'EMAIL_HOST_USER', 'noreply@example.com')
+
+    # DYNAMIC SENDER NAME: "Creator Name via LCCIA" <system@email.com>
+    sender_name = "LCCIA Forms"
+    if form.creator:
+        creator_name = f"{form.creator.first_name} {form.creator.last_name}".strip()
+        if not creator_name:
+            creator_name = form.creator.username
+        sender_name = f"{creator_name} via LCCIA"
+
+    # Construct the formatted FROM header e.g. "John Doe via LCCIA <admin@lccia.in>"
+    formatted_from = f'"{sender_name}" <{from_email}>'
+
+    # Default Subjects/Bodies
+    subject = form.email_subject or f"New Response for {form.title}"
+    body = form.email_body or f"A new response has been submitted for {form.title}."
+
+    if notification.kind == 'creator':
+        if not (form.creator and form.creator.email):
+            return None
+        current_respondent_email = notification.anonymous_email
+        if response.respondent and response.respondent.email:
+            current_respondent_email = response.respondent.email
+
+        return EmailMessage(
+            subject=f"[New Response] {subject}",
+            body=f"New Response Received:\n\n{body}\n\nLink to results: {settings.FRONTEND_URL}/forms/{form.id}/results",
+            from_email=formatted_from,
+            to=[form.creator.email],
+            reply_to=[current_respondent_email] if current_respondent_email else []
+        )
+
+    respondent_email = None
+    if response.respondent and response.respondent.email:
+        respondent_email = response.respondent.email
+    else:
+        # Try to find an 'email' type question answer
+        email_answers = getattr(response, 'email_answers', None)
+        if email_answers is None:
+            email_answers = list(response.answers.filter(question__question_type='email')[:1])
+        if email_answers:
+            respondent_email = email_answers[0].value
+
+    # Use anonymous email if provided and no other email found
+    if not respondent_email:
+        respondent_email = notification.anonymous_email
+    if not respondent_email:
+        return None
+
+    return EmailMessage(
+        subject=f"[Response Receipt] {subject}",
+        body=f"Thank you for your response!\n\n{body}",
+        from_email=formatted_from,
+        to=[respondent_email],
+        reply_to=[form.creator.email] if form.creator and form.creator.email else []
+    )
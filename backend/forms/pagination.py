@@ -0,0 +1,23 @@
+from rest_framework.pagination import CursorPagination
+
+
+class ResponseCursorPagination(CursorPagination):
+    """
+    Keyset pagination for responses, newest first. The cursor holds the last
+    created_at seen plus an offset past rows sharing it, so a page is a range
+    scan on response_form_created_idx however deep into the form it is.
+    """
+    ordering = ('-created_at', '-id')
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+
+
+class FormCursorPagination(CursorPagination):
+    """
+    Dashboard form list, newest first.
+    """
+    ordering = ('-created_at', '-id')
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 200
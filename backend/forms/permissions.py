@@ -1,6 +1,108 @@
 
+from django.conf import settings
+from django.db import transaction
 from rest_framework import permissions
-from .models import FormCollaborator
+from .authentication import forget_profile_versions
+from .cache import bump_version, make_key, versioned, versioned_many
+from .models import FormCollaborator, Role, UserProfile
+from .invitees import is_invited
+from .revocation import is_blocked
+
+# Safety net for changes made outside the API (admin, scripts); API writes bump versions
+PERMISSION_CACHE_TIMEOUT = getattr(settings, 'PERMISSION_CACHE_TIMEOUT', 60 * 5)
+
+
+class PermissionResolver:
+    """
+    Answers "which role does this user have on this form, and does it grant X"
+    from memory. The role -> permission codename map and the user's
+    form -> role map are each loaded once and cached across requests under
+    version keys, and fetched together in one cache round trip; the resolver
+    itself is memoized on the request.
+    """
+
+    def __init__(self, user):
+        self.user = user
+        builds = {'role-permissions': self._load_roles}
+        collaborations = make_key('user-collaborations', user.pk)
+        if user.is_authenticated:
+            builds[collaborations] = self._load_collaborations
+        cached = versioned_many(builds, PERMISSION_CACHE_TIMEOUT)
+        self.roles = cached['role-permissions']
+        self.collaborations = cached.get(collaborations, {})
+
+    @classmethod
+    def for_request(cls, request):
+        resolver = getattr(request, '_permission_resolver', None)
+        if resolver is None or resolver.user != request.user:
+            resolver = cls(request.user)
+            request._permission_resolver = resolver
+        return resolver
+
+    def _load_roles(self):
+        roles = {}
+        for role_id, slug, codename in Role.objects.values_list('id', 'slug', 'permissions__codename'):
+            role = roles.setdefault(role_id, {'slug': slug, 'permissions': set()})
+            if codename:
+                role['permissions'].add(codename)
+        return roles
+
+    def _load_collaborations(self):
+        return dict(FormCollaborator.objects.filter(user=self.user).values_list('form_id', 'role_id'))
+
+    def role_for(self, form):
+        """
+        Slug of the user's collaborator role on `form`, or None.
+        """
+        role = self.roles.get(self.collaborations.get(form.pk))
+        return role['slug'] if role else None
+
+    def has_form_perm(self, form, codename):
+        role = self.roles.get(self.collaborations.get(form.pk))
+        return bool(role) and codename in role['permissions']
+
+
+def invalidate_role_permissions():
+    bump_version('role-permissions')
+
+
+def invalidate_user_permissions(*user_ids):
+    bump_version(*(make_key('user-collaborations', user_id) for user_id in user_ids))
+
+
+def profile_state(user):
+    """
+    Cached {'platform_status', 'is_platform_admin', 'role_ids'} of the user's
+    profile ({} if they have none), memoized on the user object.
+    """
+    state = getattr(user, '_profile_state', None)
+    if state is None:
+        state = versioned(make_key('user-profile', user.pk), lambda: _load_profile_state(user.pk), PERMISSION_CACHE_TIMEOUT)
+        user._profile_state = state
+    return state
+
+
+def _load_profile_state(user_id):
+    rows = list(UserProfile.objects.filter(user_id=user_id).values_list('platform_status', 'is_platform_admin', 'roles'))
+    if not rows:
+        return {}
+    return {
+        'platform_status': rows[0][0],
+        'is_platform_admin': rows[0][1],
+        'role_ids': sorted(role_id for _, _, role_id in rows if role_id is not None),
+    }
+
+
+def invalidate_profiles(*user_ids):
+    bump_version(*(make_key('user-profile', user_id) for user_id in user_ids))
+    # After the bump (on_commit runs in order), so this process re-reads the new version
+    transaction.on_commit(lambda: forget_profile_versions(*user_ids))
+
+
+def is_platform_admin(user):
+    if not user or not user.is_authenticated:
+        return False
+    return user.is_superuser or profile_state(user).get('is_platform_admin', False)
 
 class IsPlatformAdmin(permissions.BasePermission):
     """
@@ -9,12 +111,7 @@ class IsPlatformAdmin(permissions.BasePermission):
     def has_permission(self, request, view):
         if not request.user or not request.user.is_authenticated:
             return False
-        if request.user.is_superuser:
-            return True
-        # Check profile
-        if hasattr(request.user, 'profile'):
-            return request.user.profile.is_platform_admin
-        return False
+        return is_platform_admin(request.user)
 
 class IsActiveUser(permissions.BasePermission):
     """
@@ -29,10 +126,8 @@ class IsActiveUser(permissions.BasePermission):
         if request.user.is_superuser:
             return True
             
-        if hasattr(request.user, 'profile'):
-            if request.user.profile.platform_status == 'blocked':
-                return False
-        return True
+        # In-memory revocation set, refreshed from the cache every few seconds
+        return not is_blocked(request.user.pk)
 
 class HasFormPermission(permissions.BasePermission):
     """
@@ -58,9 +153,7 @@ class HasFormPermission(permissions.BasePermission):
 
     def has_object_permission(self, request, view, obj):
         # 1. Platform Admin / Superuser
-        if request.user.is_superuser:
-            return True
-        if hasattr(request.user, 'profile') and request.user.profile.is_platform_admin:
+        if is_platform_admin(request.user):
             return True
             
         # 2. Public Access (Retrieve Only)
@@ -68,39 +161,33 @@ class HasFormPermission(permissions.BasePermission):
             if obj.is_public:
                 return True
             # If Private, allow if user is invited
-            if request.user.is_authenticated and obj.invitees.filter(email=request.user.email).exists():
+            if request.user.is_authenticated and is_invited(obj.id, request.user.email):
                 return True
 
+        if not request.user.is_authenticated:
+            return False
+
         # 3. Creator / Owner
-        if obj.creator == request.user:
+        if obj.creator_id == request.user.id:
             return True
             
-        # 3. Collaborator
-        try:
-            collab = FormCollaborator.objects.select_related('role').get(form=obj, user=request.user)
-            # Determine required permission for this action
-            action = view.action
-            if not action:
-                # Fallback for standard methods if action is not set (e.g. generic views)
-                if request.method in permissions.SAFE_METHODS:
-                    required_perm = 'forms.view_form'
-                elif request.method == 'DELETE':
-                    required_perm = 'forms.delete_form'
-                else:
-                    required_perm = 'forms.change_form'
+        # 4. Collaborator
+        # Determine required permission for this action
+        action = view.action
+        if not action:
+            # Fallback for standard methods if action is not set (e.g. generic views)
+            if request.method in permissions.SAFE_METHODS:
+                required_perm = 'forms.view_form'
+            elif request.method == 'DELETE':
+                required_perm = 'forms.delete_form'
             else:
-                required_perm = self.perms_map.get(action)
-            
-            if not required_perm:
-                return False # Unknown action, deny by default
-                
-            # Check if role has this permission
-            # role.permissions is a ManyToMany.
-            # We can check: collab.role.permissions.filter(codename=codename, app_label='forms').exists()
-            # To avoid DB hit on every request, we might want to cache this or prefetch.
-            # For now, simplistic check:
-            perm_codename = required_perm.split('.')[-1]
-            return collab.role.permissions.filter(codename=perm_codename).exists()
-
-        except FormCollaborator.DoesNotExist:
-            return False # Not a collaborator
+                required_perm = 'forms.change_form'
+        else:
+            required_perm = self.perms_map.get(action)
+        
+        if not required_perm:
+            return False # Unknown action, deny by default
+
+        # Check if the user's role on this form has this permission (in-memory set lookup)
+        perm_codename = required_perm.split('.')[-1]
+        return PermissionResolver.for_request(request).has_form_perm(obj, perm_codename)
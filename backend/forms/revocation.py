@@ -0,0 +1,64 @@
+"""
+Blocked users as an in-memory set of user ids, so IsActiveUser checks
+platform status without a query per request.
+
+Each process reloads the set from the database at most every
+REVOCATION_POLL_INTERVAL seconds (one indexed query for the blocked rows).
+A block therefore reaches every worker within the interval whatever the
+cache backend, and the worker that made it at once.
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.db import transaction
+
+REVOCATION_POLL_INTERVAL = getattr(settings, 'REVOCATION_POLL_INTERVAL', 2)
+
+
+class RevocationList:
+    """
+    Process-local copy of the blocked user ids, reloaded from the database
+    once it is `interval` seconds old.
+    """
+    def __init__(self, interval=REVOCATION_POLL_INTERVAL):
+        self.interval = interval
+        self.ids = frozenset()
+        self.checked_at = float('-inf')
+        self.lock = threading.Lock()
+
+    def refresh(self, force=False):
+        if not force and time.monotonic() < self.checked_at + self.interval:
+            return
+        with self.lock:
+            if not force and time.monotonic() < self.checked_at + self.interval:
+                return
+            self.ids = frozenset(_load_blocked())
+            self.checked_at = time.monotonic()
+
+    def expire(self):
+        self.checked_at = float('-inf')
+
+    def __contains__(self, user_id):
+        self.refresh()
+        return user_id in self.ids
+
+
+def _load_blocked():
+    from .models import UserProfile
+    return UserProfile.objects.filter(platform_status='blocked').values_list('user_id', flat=True)
+
+
+blocked_users = RevocationList()
+
+
+def is_blocked(user_id):
+    return user_id in blocked_users
+
+
+def invalidate_blocked_users():
+    """
+    Publish a change to who is blocked: this process reloads the set on its
+    next check after the commit, the others on their next poll.
+    """
+    transaction.on_commit(blocked_users.expire)
@@ -1,6 +1,20 @@
+import logging
+import os
+
 from django.contrib.auth.models import User, Permission
+from django.db import transaction
+from django.db.models import Prefetch, prefetch_related_objects
 from rest_framework import serializers
-from .models import Form, Section, Question, Option, Response, Answer, UserProfile, Role, FormCollaborator, FormInvitee
+from .models import Form, Section, Question, Option, Response, Answer, UserProfile, Role, FormCollaborator, FormInvitee, UploadSession
+from .authentication import profile_claims
+from .blobs import release, retain
+from .cache import bump_form_version
+from .images import image_variants, queue_form_images
+from .permissions import PermissionResolver, is_platform_admin, profile_state
+from .uploads import CHUNK_SIZE, MAX_UPLOAD_SIZE
+from .writers import FormTreeWriter
+
+logger = logging.getLogger(__name__)
 
 class PermissionSerializer(serializers.ModelSerializer):
     class Meta:
@@ -23,6 +37,25 @@ class FormInviteeSerializer(serializers.ModelSerializer):
         model = FormInvitee
         fields = ['id', 'email', 'invited_at']
 
+class UploadSessionSerializer(serializers.ModelSerializer):
+    chunk_size = serializers.SerializerMethodField()
+
+    class Meta:
+        model = UploadSession
+        fields = ['id', 'filename', 'size', 'received', 'chunk_size', 'created_at']
+        read_only_fields = ['received', 'created_at']
+
+    def get_chunk_size(self, obj):
+        return CHUNK_SIZE
+
+    def validate_filename(self, value):
+        return os.path.basename(value.replace('\\', '/')) or 'upload'
+
+    def validate_size(self, value):
+        if value is not None and not 0 <= value <= MAX_UPLOAD_SIZE:
+            raise serializers.ValidationError(f"Uploads are limited to {MAX_UPLOAD_SIZE} bytes.")
+        return value
+
 class FormCollaboratorSerializer(serializers.ModelSerializer):
     user_email = serializers.EmailField(source='user.email', read_only=True)
     user_username = serializers.CharField(source='user.username', read_only=True)
@@ -57,6 +90,8 @@ class UserRegistrationSerializer(serializers.ModelSerializer):
         return user
 
 class OptionSerializer(serializers.ModelSerializer):
+    id = serializers.IntegerField(required=False)
+
     class Meta:
         model = Option
         fields = ['id', 'text', 'order']
@@ -74,20 +109,33 @@ class QuestionSerializer(serializers.ModelSerializer):
         ]
         extra_kwargs = {'section': {'required': False}}
 
+class NestedQuestionSerializer(QuestionSerializer):
+    """
+    Question inside a submitted form tree. The parent is implied by position,
+    so 'section' is output only and not looked up once per question.
+    """
+    class Meta(QuestionSerializer.Meta):
+        extra_kwargs = {'section': {'read_only': True}}
+
 class SectionSerializer(serializers.ModelSerializer):
     id = serializers.IntegerField(required=False)
-    questions = QuestionSerializer(many=True)
+    questions = NestedQuestionSerializer(many=True)
     
     class Meta:
         model = Section
         fields = ['id', 'form', 'title', 'description', 'order', 'questions']
         extra_kwargs = {'form': {'required': False}}
 
+class NestedSectionSerializer(SectionSerializer):
+    class Meta(SectionSerializer.Meta):
+        extra_kwargs = {'form': {'read_only': True}}
+
 class FormSerializer(serializers.ModelSerializer):
-    sections = SectionSerializer(many=True)
+    sections = NestedSectionSerializer(many=True)
     creator_username = serializers.SerializerMethodField()
     has_responded = serializers.SerializerMethodField()
     my_role = serializers.SerializerMethodField()
+    image_variants = serializers.SerializerMethodField()
 
     class Meta:
         model = Form
@@ -98,13 +146,25 @@ class FormSerializer(serializers.ModelSerializer):
             'sections',
             'primary_color', 'background_color', 'logo_image', 'logo_alignment', 'background_image',
             'notify_creator', 'notify_respondent', 'email_subject', 'email_body', 'allow_multiple_responses',
-            'has_responded', 'my_role'
+            'has_responded', 'my_role', 'image_variants', 'version'
         ]
-        read_only_fields = ['creator', 'has_responded']
+        read_only_fields = ['creator', 'has_responded', 'version']
 
     def get_creator_username(self, obj):
         return obj.creator.username if obj.creator else None
 
+    def get_image_variants(self, obj):
+        # Resized AVIF/WebP copies of the branding images, once process_images has made them
+        request = self.context.get('request')
+        variants = image_variants(
+            [obj.logo_image, obj.background_image],
+            request.build_absolute_uri if request else None
+        )
+        return {
+            'logo_image': variants.get(obj.logo_image),
+            'background_image': variants.get(obj.background_image),
+        }
+
     def get_has_responded(self, obj):
         request = self.context.get('request')
         if request and request.user.is_authenticated:
@@ -117,58 +177,28 @@ class FormSerializer(serializers.ModelSerializer):
         request = self.context.get('request')
         if not request or not request.user.is_authenticated:
             return None
-        if obj.creator == request.user:
+        if obj.creator_id == request.user.id:
             return 'owner'
         
         # Superusers and Platform Admins have owner role everywhere
-        if request.user.is_superuser or (hasattr(request.user, 'profile') and request.user.profile.is_platform_admin):
+        if is_platform_admin(request.user):
             return 'owner'
         
         # Check collaborators
-        # Optimization: using filter().first()
-        collab = obj.collaborators.filter(user=request.user).select_related('role').first()
-        return collab.role.slug if collab else None
+        return PermissionResolver.for_request(request).role_for(obj)
 
 
 
     def create(self, validated_data):
         sections_data = validated_data.pop('sections', [])
-        form = Form.objects.create(**validated_data)
-        
-        # Map for resolving temp_ids in logic rules
-        temp_id_map = {}
-
-        for section_data in sections_data:
-            questions_data = section_data.pop('questions', [])
-            section = Section.objects.create(form=form, **section_data)
-            for question_data in questions_data:
-                question_data.pop('section', None)
-                options_data = question_data.pop('options', [])
-                temp_id = question_data.pop('temp_id', None) # Fix: Remove temp_id
-
-                question = Question.objects.create(section=section, **question_data)
-                
-                if temp_id:
-                    temp_id_map[str(temp_id)] = question.id
-
-                for opt_data in options_data:
-                    Option.objects.create(question=question, **opt_data)
-        
-        # Second Pass: Resolve Logic Rules
-        for section in form.sections.all():
-            for question in section.questions.all():
-                if question.logic_rules and 'condition' in question.logic_rules:
-                    condition = question.logic_rules['condition']
-                    target_q_id = str(condition.get('question_id'))
-                    
-                    if target_q_id in temp_id_map:
-                        condition['question_id'] = temp_id_map[target_q_id]
-                        question.save()
-
+        with transaction.atomic():
+            form = Form.objects.create(**validated_data)
+            FormTreeWriter(form).write(sections_data)
+            retain(form.logo_image, form.background_image)
+            queue_form_images(form.logo_image, form.background_image)
         return form
 
     def update(self, instance, validated_data):
-        print(f"DEBUG: Entering FormSerializer.update with data: {validated_data.keys()}")
         sections_data = validated_data.pop('sections', None)
         instance.title = validated_data.get('title', instance.title)
         instance.description = validated_data.get('description', instance.description)
@@ -189,102 +219,69 @@ class FormSerializer(serializers.ModelSerializer):
         instance.allow_multiple_responses = validated_data.get('allow_multiple_responses', instance.allow_multiple_responses)
         
         # Handle images
+        replaced_images = [instance.logo_image, instance.background_image]
         if 'logo_image' in validated_data:
-            print(f"DEBUG: Updating logo_image: {validated_data['logo_image']}")
             instance.logo_image = validated_data['logo_image']
         if 'background_image' in validated_data:
-            print(f"DEBUG: Updating background_image: {validated_data['background_image']}")
             instance.background_image = validated_data['background_image']
             
-        print("DEBUG: Saving instance...")
-        instance.save()
-        print("DEBUG: Instance saved.")
-
-        if sections_data is not None:
-            # Map for resolving temp_ids in logic rules
-            # Key: temp_id (str), Value: real_id (int)
-            temp_id_map = {}
-            
-            # 1. Update/Create Sections
-            existing_section_ids = [s.id for s in instance.sections.all()]
-            incoming_section_ids = [item.get('id') for item in sections_data if item.get('id')]
-            
-            # Delete removed sections
-            for sec_id in existing_section_ids:
-                if sec_id not in incoming_section_ids:
-                    Section.objects.filter(id=sec_id).delete()
-            
-            for section_data in sections_data:
-                section_id = section_data.get('id')
-                questions_data = section_data.pop('questions', [])
-                section_data.pop('form', None)
-
-                if section_id:
-                    section = Section.objects.get(id=section_id, form=instance)
-                    for attr, value in section_data.items():
-                        setattr(section, attr, value)
-                    section.save()
-                else:
-                    section = Section.objects.create(form=instance, **section_data)
-
-                # 2. Update/Create Questions within Section
-                existing_question_ids = [q.id for q in section.questions.all()]
-                incoming_question_ids = [q.get('id') for q in questions_data if q.get('id')]
-
-                # Delete removed questions
-                for q_id in existing_question_ids:
-                    if q_id not in incoming_question_ids:
-                        Question.objects.filter(id=q_id).delete()
-
-                for q_data in questions_data:
-                    q_id = q_data.get('id')
-                    temp_id = q_data.pop('temp_id', None) # Extract temp_id if present
-                    q_data.pop('section', None)
-                    options_data = q_data.pop('options', [])
-                    
-                    if q_id:
-                        question = Question.objects.get(id=q_id, section=section)
-                        for attr, value in q_data.items():
-                            setattr(question, attr, value)
-                        question.save()
-                    else:
-                        question = Question.objects.create(section=section, **q_data)
-                        if temp_id:
-                            temp_id_map[str(temp_id)] = question.id
-
-                    # 3. Update Options
-                    existing_opt_ids = [o.id for o in question.options.all()]
-                    incoming_opt_ids = [o.get('id') for o in options_data if o.get('id')]
-
-                    for o_id in existing_opt_ids:
-                        if o_id not in incoming_opt_ids:
-                            Option.objects.filter(id=o_id).delete()
-
-                    for opt_data in options_data:
-                        opt_id = opt_data.get('id')
-                        if opt_id:
-                            opt = Option.objects.get(id=opt_id, question=question)
-                            for attr, value in opt_data.items():
-                                setattr(opt, attr, value)
-                            opt.save()
-                        else:
-                            Option.objects.create(question=question, **opt_data)
-            
-            # 4. Second Pass: Resolve Logic Rules
-            # Iterate through all questions in the form to update logic references
-            for section in instance.sections.all():
-                for question in section.questions.all():
-                    if question.logic_rules and 'condition' in question.logic_rules:
-                        condition = question.logic_rules['condition']
-                        target_q_id = str(condition.get('question_id'))
-                        
-                        # If target is a temp_id, replace with real ID
-                        if target_q_id in temp_id_map:
-                            condition['question_id'] = temp_id_map[target_q_id]
-                            question.save()
-                            
+        with transaction.atomic():
+            # Bump the version in the same UPDATE; form_changed drops the cached schema
+            bump_form_version(instance)
+            images = [instance.logo_image, instance.background_image]
+            if images != replaced_images:
+                release(*replaced_images)
+                retain(*images)
+                queue_form_images(*images)
+
+            if sections_data is not None:
+                FormTreeWriter(instance).load().write(sections_data)
+
+        logger.info("form updated", extra={'event': 'form.updated', 'form_id': instance.id, 'tree': sections_data is not None})
         return instance
 
+class FormListSerializer(FormSerializer):
+    """
+    Dashboard card: form-level fields only, without the sections tree.
+    Counts, has_responded and my_role come from annotations on the
+    queryset (see FormViewSet._with_dashboard_fields).
+    """
+    sections = None
+    image_variants = None
+    creator_username = serializers.CharField(source='creator.username', read_only=True, default=None)
+    has_responded = serializers.BooleanField(read_only=True)
+    my_role = serializers.CharField(read_only=True, allow_null=True)
+    response_count = serializers.IntegerField(read_only=True)
+    question_count = serializers.IntegerField(read_only=True)
+    last_response_at = serializers.DateTimeField(read_only=True, allow_null=True)
+
+    class Meta(FormSerializer.Meta):
+        fields = [
+            'id', 'title', 'description', 'creator', 'creator_username',
+            'is_public', 'created_at', 'updated_at', 'published_at', 'slug',
+            'is_active', 'expiry_at',
+            'response_count', 'question_count', 'last_response_at',
+            'has_responded', 'my_role'
+        ]
+
+class FormSchemaSerializer(FormSerializer):
+    """
+    The user-independent part of FormSerializer; this is what forms.cache stores.
+    """
+    has_responded = None
+    my_role = None
+
+    class Meta(FormSerializer.Meta):
+        fields = [f for f in FormSerializer.Meta.fields if f not in ('has_responded', 'my_role')]
+
+def build_form_schema(form, request=None):
+    """
+    The cacheable definition of `form` (see cache.form_schema). `request`
+    only serves to make image variant URLs absolute.
+    """
+    prefetch_related_objects([form], 'creator', 'sections__questions__options')
+    return FormSchemaSerializer(form, context={'request': request}).data
+
 class AnswerSerializer(serializers.ModelSerializer):
     question_text = serializers.CharField(source='question.text', read_only=True)
 
@@ -292,19 +289,49 @@ class AnswerSerializer(serializers.ModelSerializer):
         model = Answer
         fields = ['id', 'question', 'question_text', 'value']
 
+class SubmittedAnswerSerializer(AnswerSerializer):
+    """
+    Answer inside a submission. Question ids are checked for the whole
+    submission at once in ResponseSerializer.validate, not one lookup per answer.
+    """
+    question = serializers.IntegerField(source='question_id')
+
 class ResponseSerializer(serializers.ModelSerializer):
-    answers = AnswerSerializer(many=True)
+    answers = SubmittedAnswerSerializer(many=True)
 
     class Meta:
         model = Response
         fields = ['id', 'form', 'respondent', 'created_at', 'answers']
         read_only_fields = ['respondent', 'created_at']
 
+    def validate(self, attrs):
+        form = attrs.get('form') or self.instance.form
+        if self.instance is None and not form.accepts_responses():
+            raise serializers.ValidationError({'detail': form.inactive_message})
+        if 'answers' not in attrs:
+            return attrs
+        question_ids = {answer['question_id'] for answer in attrs['answers']}
+        questions = Question.objects.filter(section__form=form, id__in=question_ids).prefetch_related('options').in_bulk()
+
+        missing = question_ids - questions.keys()
+        if missing:
+            raise serializers.ValidationError({'answers': f"Questions {sorted(missing)} do not belong to this form."})
+
+        for answer in attrs['answers']:
+            answer['question'] = questions[answer.pop('question_id')]
+        return attrs
+
     def create(self, validated_data):
         answers_data = validated_data.pop('answers', [])
-        response = Response.objects.create(**validated_data)
-        for answer_data in answers_data:
-            Answer.objects.create(response=response, **answer_data)
+        with transaction.atomic():
+            response = Response.objects.create(**validated_data)
+            answers = [Answer(response=response, **answer_data) for answer_data in answers_data]
+            # bulk_create skips save(), so fill the typed columns here
+            for answer in answers:
+                answer.fill_typed_values(answer.question.options.all())
+            Answer.objects.bulk_create(answers)
+            retain(*(answer.value for answer in answers if answer.question.question_type == 'file_upload'))
+        prefetch_related_objects([response], Prefetch('answers', queryset=Answer.objects.select_related('question')))
         return response
 
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
@@ -321,6 +348,15 @@ class AdminUserSerializer(serializers.ModelSerializer):
         fields = ['id', 'username', 'email', 'first_name', 'last_name', 'date_joined', 'platform_status', 'is_platform_admin', 'roles', 'is_superuser']
 
 class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
+    @classmethod
+    def get_token(cls, user):
+        token = super().get_token(user)
+        # Signed profile claims; ProfileJWTAuthentication can trust them
+        # instead of loading the user (JWT_TRUST_PROFILE_CLAIMS)
+        for claim, value in profile_claims(user, profile_state(user)).items():
+            token[claim] = value
+        return token
+
     def validate(self, attrs):
         data = super().validate(attrs)
         data['username'] = self.user.username
@@ -329,12 +365,9 @@ class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
         
         data['is_superuser'] = self.user.is_superuser
         
-        # Add Admin/Status info
-        if hasattr(self.user, 'profile'):
-            data['is_platform_admin'] = self.user.profile.is_platform_admin
-            data['platform_status'] = self.user.profile.platform_status
-        else:
-            data['is_platform_admin'] = False
-            data['platform_status'] = 'active' # Default
+        # Add Admin/Status info (users without a profile count as active non-admins)
+        state = profile_state(self.user)
+        data['is_platform_admin'] = state.get('is_platform_admin', False)
+        data['platform_status'] = state.get('platform_status', 'active')
             
         return data
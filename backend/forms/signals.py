@@ -0,0 +1,105 @@
+"""
+Cache invalidation hooked to model signals, so writes from anywhere (admin,
+shell, scripts, nested viewsets) bump the same version keys as the API.
+Bulk writes (FormTreeWriter, queryset.update) send no signals and keep
+invalidating explicitly.
+"""
+import threading
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from .cache import invalidate_form_schema, touch_forms
+from .models import Form, Option, Question, Role, Section, UserProfile
+from .permissions import invalidate_profiles, invalidate_role_permissions
+from .revocation import invalidate_blocked_users
+
+# Parents of changed tree rows, resolved to form ids once per transaction:
+# deleting a form cascades to every option, and each would otherwise cost
+# its own lookup and UPDATE.
+_pending = threading.local()
+
+
+def _touch_later(kind, parent_id):
+    pending = getattr(_pending, 'ids', None)
+    if pending is None:
+        pending = _pending.ids = {'form': set(), 'section': set(), 'question': set()}
+    if parent_id is not None:
+        pending[kind].add(parent_id)
+    transaction.on_commit(_flush)
+
+
+def _flush():
+    pending = getattr(_pending, 'ids', None)
+    if not pending or not any(pending.values()):
+        return
+    _pending.ids = None
+    # Rows whose parents went in the same delete resolve to nothing; the
+    # parent's own signal covers them
+    form_ids = set(pending['form'])
+    if pending['section']:
+        form_ids.update(Section.objects.filter(id__in=pending['section']).values_list('form_id', flat=True))
+    if pending['question']:
+        form_ids.update(Question.objects.filter(id__in=pending['question']).values_list('section__form_id', flat=True))
+    touch_forms(*form_ids)
+
+
+@receiver([post_save, post_delete], sender=Form)
+def form_changed(sender, instance, **kwargs):
+    # save() has already moved updated_at; only the cached schema is stale
+    invalidate_form_schema(instance.id)
+
+
+@receiver([post_save, post_delete], sender=Section)
+def section_changed(sender, instance, **kwargs):
+    _touch_later('form', instance.form_id)
+
+
+@receiver([post_save, post_delete], sender=Question)
+def question_changed(sender, instance, **kwargs):
+    _touch_later('section', instance.section_id)
+
+
+@receiver([post_save, post_delete], sender=Option)
+def option_changed(sender, instance, **kwargs):
+    _touch_later('question', instance.question_id)
+
+
+@receiver([post_save, post_delete], sender=Role)
+def role_changed(sender, **kwargs):
+    invalidate_role_permissions()
+
+
+@receiver(m2m_changed, sender=Role.permissions.through)
+def role_permissions_changed(sender, action, **kwargs):
+    if action.startswith('post_'):
+        invalidate_role_permissions()
+
+
+@receiver([post_save, post_delete], sender=User)
+def user_changed(sender, instance, update_fields=None, **kwargs):
+    # Tokens carry username, email and flags (see authentication.profile_claims);
+    # a login stamping last_login changes none of them
+    if update_fields is not None and set(update_fields) <= {'last_login'}:
+        return
+    invalidate_profiles(instance.pk)
+
+
+@receiver([post_save, post_delete], sender=UserProfile)
+def profile_changed(sender, instance, update_fields=None, **kwargs):
+    invalidate_profiles(instance.user_id)
+    if update_fields is None or 'platform_status' in update_fields:
+        invalidate_blocked_users()
+
+
+@receiver(m2m_changed, sender=UserProfile.roles.through)
+def profile_roles_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if not action.startswith('post_'):
+        return
+    if reverse:
+        # role.user_profiles.add(...): instance is the Role
+        invalidate_profiles(*UserProfile.objects.filter(pk__in=pk_set or ()).values_list('user_id', flat=True))
+    else:
+        invalidate_profiles(instance.user_id)
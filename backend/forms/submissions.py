@@ -0,0 +1,279 @@
+"""
+Response submission checked against the cached form schema instead of the
+question rows: the write path behind the async submit endpoint
+(views.submit_response). Same rules as ResponseViewSet.create.
+
+With SUBMISSION_WRITE_BEHIND on, submissions are instead appended to the
+PendingSubmission table and acknowledged; the flush_submissions worker
+group-commits them (flush_pending), hundreds per transaction.
+"""
+import logging
+
+from django.conf import settings
+from django.db import IntegrityError, router, transaction
+from django.utils.dateparse import parse_datetime
+from rest_framework import serializers
+from rest_framework.exceptions import NotFound, ValidationError
+
+from .answers import OPTION_TYPES, typed_values
+from .blobs import retain
+from .cache import form_schema, get_form_schema, invalidate_form_schema
+from .models import Answer, Form, NotificationOutbox, Option, PendingSubmission, Question, Response
+from .notifications import notification_rows, queue_notifications
+from .serializers import build_form_schema
+
+logger = logging.getLogger(__name__)
+
+# Pending submissions written per transaction by flush_pending()
+FLUSH_SIZE = getattr(settings, 'SUBMISSION_FLUSH_SIZE', 500)
+
+# Form fields the write path needs, read from the schema instead of the form row
+_FORM_FIELDS = ['id', 'creator_id', 'notify_creator', 'notify_respondent', 'allow_multiple_responses']
+
+
+def load_schema(lookup, request=None):
+    """
+    Cached schema for a form id or slug, building (and caching) it on a miss.
+    """
+    schema = get_form_schema(lookup)
+    if schema is None:
+        form = Form.objects.filter(**{'pk' if str(lookup).isdigit() else 'slug': lookup}).first()
+        if form is None:
+            raise NotFound("Form not found.")
+        schema = form_schema(form, lambda form: build_form_schema(form, request))
+    return schema
+
+
+def schema_questions(schema):
+    """
+    {question id: question} over every section of a cached schema.
+    """
+    return {question['id']: question for section in schema['sections'] for question in section['questions']}
+
+
+def check_open(schema):
+    """
+    Refuse the submission unless the form takes responses now, the same
+    Form.accepts_responses rule ResponseSerializer.validate applies.
+    """
+    expiry_at = schema['expiry_at']
+    form = Form(is_active=schema['is_active'], expiry_at=parse_datetime(expiry_at) if expiry_at else None)
+    if not form.accepts_responses():
+        raise ValidationError({'detail': schema['inactive_message']})
+
+
+def check_answers(schema, answers):
+    """
+    Check SubmittedAnswerSerializer data against the schema, as
+    ResponseSerializer.validate does against the database. Returns the
+    schema's questions by id.
+    """
+    questions = schema_questions(schema)
+    missing = {answer['question_id'] for answer in answers} - questions.keys()
+    if missing:
+        raise ValidationError({'answers': f"Questions {sorted(missing)} do not belong to this form."})
+    return questions
+
+
+def fresh_schema(form_id):
+    """
+    The form's schema built from the database, bypassing the cache, whose
+    entry is dropped. Raises NotFound if the form is gone.
+    """
+    invalidate_form_schema(form_id)
+    form = Form.objects.filter(pk=form_id).first()
+    if form is None:
+        raise NotFound("Form not found.")
+    return build_form_schema(form)
+
+
+def save_submission(schema, questions, answers, user=None, respondent_email=None, recheck=True):
+    """
+    Write a response, its answers (typed columns filled from the schema's
+    options) and its queued notifications in one transaction. Returns the
+    Response with `saved_answers` set.
+
+    If the database refuses the write because the cached schema was out of
+    date (the form, a question or an option deleted since), the submission
+    is checked again against a fresh schema and, if still valid, retried once.
+    """
+    single = not schema['allow_multiple_responses'] and user is not None and user.is_authenticated
+    form = Form.from_db(router.db_for_write(Form), _FORM_FIELDS, [
+        schema['id'], schema['creator'], schema['notify_creator'], schema['notify_respondent'],
+        schema['allow_multiple_responses'],
+    ])
+    try:
+        with transaction.atomic():
+            # 1. Response limit (unique_single_submission settles concurrent races)
+            if single and Response.objects.filter(form=form, respondent=user).exists():
+                raise ValidationError({'detail': "You have already responded to this form."})
+
+            # 2. Response and answers
+            response = Response.objects.create(
+                form=form, respondent=user if user is not None and user.is_authenticated else None,
+                single_submission=single,
+            )
+            saved = []
+            for data in answers:
+                question = questions[data['question_id']]
+                answer = Answer(response=response, question_id=question['id'], value=data.get('value'))
+                options = [Option(id=option['id'], text=option['text']) for option in question.get('options') or ()]
+                for field, typed in typed_values(question['question_type'], answer.value, options).items():
+                    setattr(answer, field, typed)
+                saved.append(answer)
+            Answer.objects.bulk_create(saved)
+            retain(*(answer.value for answer in saved if questions[answer.question_id]['question_type'] == 'file_upload'))
+
+            # 3. Emails (sent by the send_notifications worker)
+            queue_notifications(response, anonymous_email=respondent_email)
+    except IntegrityError:
+        if single and Response.objects.filter(form_id=schema['id'], respondent=user).exists():
+            raise ValidationError({'detail': "You have already responded to this form."})
+        if not recheck:
+            raise
+        schema = fresh_schema(schema['id'])
+        check_open(schema)
+        questions = check_answers(schema, answers)
+        return save_submission(schema, questions, answers, user, respondent_email, recheck=False)
+    response.saved_answers = saved
+    return response
+
+
+def submission_data(response, questions):
+    """
+    The ResponseSerializer representation of a response from save_submission.
+    """
+    return {
+        'id': response.id,
+        'form': response.form_id,
+        'respondent': response.respondent_id,
+        'created_at': serializers.DateTimeField().to_representation(response.created_at),
+        'answers': [
+            {
+                'id': answer.id,
+                'question': answer.question_id,
+                'question_text': questions[answer.question_id]['text'],
+                'value': answer.value,
+            }
+            for answer in response.saved_answers
+        ],
+    }
+
+
+def write_behind(schema, user=None):
+    """
+    Whether this submission goes through the PendingSubmission buffer.
+    One-response-per-user forms are always written directly, since the
+    duplicate check has to answer the request.
+    """
+    if not getattr(settings, 'SUBMISSION_WRITE_BEHIND', False):
+        return False
+    return schema['allow_multiple_responses'] or user is None or not user.is_authenticated
+
+
+def buffer_submission(schema, answers, user=None, respondent_email=None):
+    """
+    Write-behind counterpart of save_submission: one INSERT of the already
+    validated submission, flushed later by flush_pending().
+    """
+    return PendingSubmission.objects.create(
+        form_id=schema['id'],
+        respondent=user if user is not None and user.is_authenticated else None,
+        answers=[{'question': answer['question_id'], 'value': answer.get('value')} for answer in answers],
+        respondent_email=respondent_email or None,
+    )
+
+
+def flush_pending(batch_size=FLUSH_SIZE):
+    """
+    Group-commit up to `batch_size` pending submissions: their responses,
+    answers and notifications go in with bulk_create and the pending rows
+    are deleted, all in one transaction. Concurrent flushers skip each
+    other's rows. Returns the number of pending submissions processed.
+
+    The form is checked again first. Submissions it no longer takes (closed
+    since they were accepted, or a repeat once the form switched to one
+    response per user) are kept with status 'rejected' and logged.
+    """
+    with transaction.atomic():
+        batch = list(
+            PendingSubmission.objects.select_for_update(skip_locked=True)
+            .filter(status='pending').order_by('id')[:batch_size]
+        )
+        if not batch:
+            return 0
+
+        # 1. What the checks, typed answer columns and notifications need, per batch
+        forms = Form.objects.only(
+            'id', 'creator_id', 'notify_creator', 'notify_respondent', 'allow_multiple_responses',
+            'is_active', 'expiry_at',
+        ).in_bulk({pending.form_id for pending in batch})
+        questions = Question.objects.only('id', 'question_type').in_bulk(
+            {answer['question'] for pending in batch for answer in pending.answers}
+        )
+        options = {}
+        choice_ids = [question.id for question in questions.values() if question.question_type in OPTION_TYPES]
+        for option in Option.objects.filter(question_id__in=choice_ids).only('id', 'question_id', 'text'):
+            options.setdefault(option.question_id, []).append(option)
+
+        # 2. What the form still takes
+        single_forms = [form.id for form in forms.values() if not form.allow_multiple_responses]
+        responded = set(Response.objects.filter(
+            form_id__in=single_forms, respondent_id__in={pending.respondent_id for pending in batch},
+        ).values_list('form_id', 'respondent_id')) if single_forms else set()
+        accepted, rejected = [], []
+        for pending in batch:
+            form = forms[pending.form_id]
+            single = not form.allow_multiple_responses and pending.respondent_id is not None
+            if not form.accepts_responses(pending.created_at):
+                pending.rejected_reason = "The form is no longer accepting responses."
+            elif single and (form.id, pending.respondent_id) in responded:
+                pending.rejected_reason = "The respondent has already responded to this form."
+            else:
+                if single:
+                    responded.add((form.id, pending.respondent_id))
+                accepted.append((pending, single))
+                continue
+            pending.status = 'rejected'
+            rejected.append(pending)
+
+        # 3. Responses, stamped with when they were accepted, not flushed
+        responses = [
+            Response(
+                form=forms[pending.form_id], respondent_id=pending.respondent_id,
+                single_submission=single, created_at=pending.created_at,
+            )
+            for pending, single in accepted
+        ]
+        Response.objects.bulk_create(responses)
+
+        # 4. Answers (to questions deleted since acceptance are dropped) and e-mails
+        answers = []
+        for response, (pending, _) in zip(responses, accepted):
+            for data in pending.answers:
+                question = questions.get(data['question'])
+                if question is None:
+                    continue
+                answer = Answer(response=response, question=question, value=data['value'])
+                answer.fill_typed_values(options.get(question.id, ()))
+                answers.append(answer)
+        Answer.objects.bulk_create(answers, batch_size=2000)
+        retain(*(answer.value for answer in answers if answer.question.question_type == 'file_upload'))
+        NotificationOutbox.objects.bulk_create([
+            row for response, (pending, _) in zip(responses, accepted)
+            for row in notification_rows(response, pending.respondent_email)
+        ])
+
+        PendingSubmission.objects.filter(id__in=[pending.id for pending, _ in accepted]).delete()
+        PendingSubmission.objects.bulk_update(rejected, ['status', 'rejected_reason'])
+
+    if rejected:
+        logger.warning("pending submissions rejected", extra={
+            'event': 'submissions.rejected',
+            'rejected': [{'id': pending.id, 'form_id': pending.form_id, 'reason': pending.rejected_reason} for pending in rejected],
+        })
+    logger.info("submissions flushed", extra={
+        'event': 'submissions.flush', 'submissions': len(responses), 'rejected': len(rejected),
+        'answers': len(answers),
+    })
+    return len(batch)
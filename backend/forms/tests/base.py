@@ -0,0 +1,59 @@
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from forms import revocation
+from forms.models import UserProfile
+
+
+def question(text, question_type='short_text', **extra):
+    return {'text': text, 'question_type': question_type, 'order': 0, 'options': [], **extra}
+
+
+def choice(text, *options, **extra):
+    return question(text, 'radio', options=[{'text': option, 'order': i} for i, option in enumerate(options)], **extra)
+
+
+def make_user(username, **profile):
+    user = User.objects.create_user(username, f'{username}@example.com', 'pw')
+    UserProfile.objects.create(user=user, **profile)
+    return user
+
+
+def client_for(user=None):
+    client = APIClient()
+    if user is not None:
+        client.force_authenticate(user)
+    return client
+
+
+class APITestCase(TestCase):
+    """
+    A signed-in form owner (self.owner, self.api) and an anonymous client
+    (self.anon), with the cache and the revocation set reset around each test.
+    """
+    def setUp(self):
+        cache.clear()
+        revocation.blocked_users.expire()
+        self.addCleanup(cache.clear)
+        self.addCleanup(revocation.blocked_users.expire)
+        self.owner = make_user('owner')
+        self.api = client_for(self.owner)
+        self.anon = client_for()
+
+    def create_form(self, sections, **fields):
+        response = self.api.post('/api/forms/', {'title': 'Form', 'sections': sections, **fields}, format='json')
+        self.assertEqual(response.status_code, 201, response.content)
+        return response.json()
+
+    def submit(self, form, answers, client=None):
+        """
+        POST /api/responses/ with {question id: value} answers.
+        """
+        payload = {'form': form['id'], 'answers': [{'question': qid, 'value': value} for qid, value in answers.items()]}
+        return (client or self.anon).post('/api/responses/', payload, format='json')
+
+
+def question_ids(form):
+    return [q['id'] for section in form['sections'] for q in section['questions']]
@@ -0,0 +1,21 @@
+from forms.cache import get_version, make_key
+from forms.models import Form
+
+from .base import APITestCase, question
+
+
+class FormVersionTests(APITestCase):
+    def test_an_update_bumps_each_version_once(self):
+        form = self.create_form([{'title': 'S', 'order': 0, 'questions': [question('Q')]}])
+        name = make_key('form-schema', form['id'])
+        before = get_version(name)
+
+        form['title'] = 'Renamed'
+        form['sections'][0]['questions'].append(question('New'))
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.api.put(f"/api/forms/{form['id']}/", form, format='json')
+
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(response.json()['version'], form['version'] + 1)
+        self.assertEqual(Form.objects.get(pk=form['id']).version, form['version'] + 1)
+        self.assertEqual(get_version(name), before + 1)
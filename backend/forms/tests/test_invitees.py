@@ -0,0 +1,39 @@
+from django.test import override_settings
+
+from forms.invitees import is_invited
+
+from .base import APITestCase, client_for, make_user, question
+
+
+class InviteeCacheTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.form = self.create_form([{'title': 'S', 'order': 0, 'questions': [question('Q')]}], is_public=False)
+        self.url = f"/api/forms/{self.form['id']}/"
+        self.guest = client_for(make_user('guest'))
+
+    def check_access(self, email):
+        return self.anon.post(self.url + 'check_access/', {'email': email}, format='json').json()['invited']
+
+    def test_adding_and_removing_invitees_updates_access(self):
+        self.assertFalse(self.check_access('guest@example.com'))
+        self.assertIn(self.guest.get(self.url).status_code, (403, 404))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.api.post(self.url + 'invitees/', {'emails': ['Guest@Example.com ']}, format='json')
+        self.assertTrue(self.check_access('guest@example.com'))
+        self.assertEqual(self.guest.get(self.url).status_code, 200)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.api.delete(self.url + 'invitees/?email=GUEST@example.com')
+        self.assertFalse(self.check_access('guest@example.com'))
+        self.assertIn(self.guest.get(self.url).status_code, (403, 404))
+
+    @override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+    def test_warm_lookups_skip_the_database(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.api.post(self.url + 'invitees/', {'emails': ['a@example.com', 'b@example.com']}, format='json')
+        is_invited(self.form['id'], 'warm@example.com')
+        with self.assertNumQueries(0):
+            self.assertTrue(is_invited(self.form['id'], 'A@example.com'))
+            self.assertFalse(is_invited(self.form['id'], 'c@example.com'))
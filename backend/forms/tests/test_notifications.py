@@ -0,0 +1,89 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.core import mail
+from django.core.management import call_command
+from django.test import override_settings
+from django.utils import timezone
+
+from forms import notifications
+from forms.models import NotificationOutbox
+
+from .base import APITestCase, question, question_ids
+
+
+@override_settings(EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend')
+class OutboxTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.form = self.create_form(
+            [{'title': 'S', 'order': 0, 'questions': [question('Email', 'email')]}],
+            notify_creator=True, notify_respondent=True,
+        )
+
+    def respond(self, count=1):
+        qid = question_ids(self.form)[0]
+        for i in range(count):
+            self.assertEqual(self.submit(self.form, {qid: f'r{i}@example.com'}).status_code, 201)
+
+    def test_submissions_queue_rows_and_the_worker_sends_them(self):
+        self.respond(3)
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(NotificationOutbox.objects.count(), 6)
+
+        call_command('send_notifications', '--once')
+
+        self.assertEqual(NotificationOutbox.objects.filter(status='sent').count(), 6)
+        recipients = sorted(message.to[0] for message in mail.outbox)
+        self.assertEqual(recipients, ['owner@example.com'] * 3 + ['r0@example.com', 'r1@example.com', 'r2@example.com'])
+
+    def test_claimed_rows_are_leased(self):
+        self.respond(2)
+        claimed = notifications._claim(10)
+        self.assertEqual(len(claimed), 4)
+        # A second worker sees nothing while the lease holds
+        self.assertEqual(notifications._claim(10), [])
+
+        # The first worker died; once the lease runs out the rows are due again
+        NotificationOutbox.objects.update(next_attempt_at=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(len(notifications._claim(10)), 4)
+
+    def test_send_failures_back_off_then_fail(self):
+        self.respond()
+        NotificationOutbox.objects.filter(kind='respondent').delete()
+        send = 'django.core.mail.backends.locmem.EmailBackend.send_messages'
+
+        with mock.patch(send, side_effect=OSError('smtp down')):
+            before = timezone.now()
+            self.assertEqual(notifications.deliver_pending(), 1)
+        row = NotificationOutbox.objects.get()
+        self.assertEqual((row.status, row.attempts), ('pending', 1))
+        self.assertIn('smtp down', row.last_error)
+        self.assertGreaterEqual(row.next_attempt_at, before + timedelta(seconds=notifications.RETRY_BACKOFF))
+        # Not due yet
+        self.assertEqual(notifications.deliver_pending(), 0)
+
+        with mock.patch(send, side_effect=OSError('smtp down')):
+            for _ in range(notifications.MAX_ATTEMPTS - 1):
+                NotificationOutbox.objects.update(next_attempt_at=timezone.now())
+                notifications.deliver_pending()
+        row.refresh_from_db()
+        self.assertEqual((row.status, row.attempts), ('failed', notifications.MAX_ATTEMPTS))
+        self.assertEqual(len(mail.outbox), 0)
+
+    def test_build_failures_are_retried_without_blocking_the_batch(self):
+        self.respond()
+        real = notifications.build_message
+
+        def build(notification):
+            if notification.kind == 'creator':
+                raise RuntimeError('bad template')
+            return real(notification)
+
+        with mock.patch.object(notifications, 'build_message', side_effect=build):
+            self.assertEqual(notifications.deliver_pending(), 2)
+        creator = NotificationOutbox.objects.get(kind='creator')
+        self.assertEqual((creator.status, creator.attempts), ('pending', 1))
+        self.assertIn('bad template', creator.last_error)
+        self.assertEqual(NotificationOutbox.objects.get(kind='respondent').status, 'sent')
+        self.assertEqual([message.to for message in mail.outbox], [['r0@example.com']])
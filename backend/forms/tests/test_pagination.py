@@ -0,0 +1,46 @@
+from datetime import timedelta
+
+from django.utils import timezone
+
+from forms.models import Response
+
+from .base import APITestCase, question, question_ids
+
+
+class ResponseCursorPaginationTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.form = self.create_form([{'title': 'S', 'order': 0, 'questions': [question('Q')]}])
+        qid = question_ids(self.form)[0]
+        for i in range(25):
+            self.assertEqual(self.submit(self.form, {qid: str(i)}).status_code, 201)
+        # Several responses share a timestamp, so the id tiebreaker matters
+        now = timezone.now()
+        for i, response in enumerate(Response.objects.order_by('id')):
+            Response.objects.filter(pk=response.pk).update(created_at=now - timedelta(minutes=i // 3))
+
+    def walk(self, url):
+        ids = []
+        while url:
+            page = self.api.get(url).json()
+            ids += [response['id'] for response in page['results']]
+            url = page['next']
+        return ids
+
+    def test_pages_cover_every_response_once_newest_first(self):
+        ids = self.walk(f"/api/responses/?form={self.form['id']}&page_size=4")
+        expected = list(Response.objects.order_by('-created_at', '-id').values_list('id', flat=True))
+        self.assertEqual(ids, expected)
+
+    def test_new_responses_do_not_shift_later_pages(self):
+        page = self.api.get(f"/api/responses/?form={self.form['id']}&page_size=10").json()
+        seen = [response['id'] for response in page['results']]
+        self.submit(self.form, {question_ids(self.form)[0]: 'late'})
+        seen += self.walk(page['next'])
+        self.assertEqual(len(seen), len(set(seen)))
+        self.assertEqual(len(seen), 25)
+
+    def test_page_size_is_capped(self):
+        page = self.api.get(f"/api/responses/?form={self.form['id']}&page_size=100000").json()
+        self.assertEqual(len(page['results']), 25)
+        self.assertIsNone(page['next'])
@@ -0,0 +1,54 @@
+from unittest import mock
+
+from django.contrib.auth.models import Permission, User
+from django.core.cache import cache
+
+from forms.models import Role
+from forms.permissions import PermissionResolver
+
+from .base import APITestCase, client_for, make_user, question
+
+
+class CollaboratorPermissionTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.role = Role.objects.create(name='Viewer', slug='viewer')
+        self.role.permissions.add(Permission.objects.get(codename='view_form'))
+        self.viewer = make_user('viewer')
+        self.viewer_api = client_for(self.viewer)
+        self.form = self.create_form([{'title': 'S', 'order': 0, 'questions': [question('Q')]}], is_public=False)
+        self.url = f"/api/forms/{self.form['id']}/"
+
+    def test_grants_and_revocations_apply_on_the_next_request(self):
+        self.assertEqual(self.viewer_api.get(self.url + 'results/').status_code, 404)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.api.post(self.url + 'collaborators/', {'email': 'viewer@example.com', 'role': 'viewer'}, format='json')
+        response = self.viewer_api.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['my_role'], 'viewer')
+        self.assertEqual(self.viewer_api.get(self.url + 'results/').status_code, 403)
+
+        # Changing the role's permissions reaches users who already hold it
+        admin = User.objects.create_superuser('admin', 'admin@example.com', 'pw')
+        permissions = Permission.objects.filter(codename__in=['view_form', 'view_responses'])
+        with self.captureOnCommitCallbacks(execute=True):
+            response = client_for(admin).patch(
+                f'/api/roles/{self.role.id}/', {'permissions': [p.id for p in permissions]}, format='json'
+            )
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(self.viewer_api.get(self.url + 'results/').status_code, 200)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.api.post(self.url + 'remove_collaborator/', {'email': 'viewer@example.com'}, format='json')
+        self.assertEqual(self.viewer_api.get(self.url).status_code, 403)
+
+    def test_a_warm_resolver_is_one_cache_round_trip(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.api.post(self.url + 'collaborators/', {'email': 'viewer@example.com', 'role': 'viewer'}, format='json')
+        PermissionResolver(self.viewer)
+
+        with mock.patch('forms.cache.cache', wraps=cache) as spy, self.assertNumQueries(0):
+            resolver = PermissionResolver(self.viewer)
+        self.assertEqual([name for name, args, kwargs in spy.method_calls], ['get_many'])
+        self.assertEqual(resolver.role_for(mock.Mock(pk=self.form['id'])), 'viewer')
@@ -0,0 +1,55 @@
+from django.core.cache import cache
+
+from forms import revocation
+from forms.models import UserProfile
+
+from .base import APITestCase, client_for, make_user
+
+
+class RevocationTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.member = make_user('member')
+        self.member_api = client_for(self.member)
+        self.admin_api = client_for(make_user('admin', is_platform_admin=True))
+
+    def set_status(self, action):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.admin_api.patch(f'/api/admin/users/{self.member.id}/{action}/')
+        self.assertEqual(response.status_code, 200, response.content)
+
+    def test_block_applies_to_existing_tokens_immediately(self):
+        self.assertEqual(self.member_api.get('/api/forms/').status_code, 200)
+
+        self.set_status('block')
+        self.assertTrue(revocation.is_blocked(self.member.id))
+        self.assertEqual(self.member_api.get('/api/forms/').status_code, 403)
+
+        self.set_status('unblock')
+        self.assertFalse(revocation.is_blocked(self.member.id))
+        self.assertEqual(self.member_api.get('/api/forms/').status_code, 200)
+
+    def test_warm_checks_skip_the_database(self):
+        revocation.is_blocked(self.member.id)
+        with self.assertNumQueries(0):
+            self.assertFalse(revocation.is_blocked(self.member.id))
+
+    def test_other_workers_pick_up_changes_from_the_database(self):
+        # Another process: no on_commit hook reaches it and the cache is not shared
+        other = revocation.RevocationList(interval=0)
+        self.assertNotIn(self.member.id, other)
+
+        UserProfile.objects.filter(user=self.member).update(platform_status='blocked')
+        cache.clear()
+        self.assertIn(self.member.id, other)
+
+        UserProfile.objects.filter(user=self.member).update(platform_status='active')
+        self.assertNotIn(self.member.id, other)
+
+    def test_polling_interval_bounds_staleness(self):
+        other = revocation.RevocationList(interval=3600)
+        self.assertNotIn(self.member.id, other)
+        UserProfile.objects.filter(user=self.member).update(platform_status='blocked')
+        self.assertNotIn(self.member.id, other)
+        other.expire()
+        self.assertIn(self.member.id, other)
@@ -0,0 +1,24 @@
+from .base import APITestCase, question
+
+
+class FormSchemaCacheTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.form = self.create_form([{'title': 'S', 'order': 0, 'questions': [question('Q')]}], slug='launch')
+
+    def test_warm_anonymous_reads_make_no_queries(self):
+        for lookup in (self.form['id'], 'launch'):
+            url = f'/api/forms/{lookup}/'
+            self.assertEqual(self.anon.get(url).status_code, 200)
+            with self.assertNumQueries(0):
+                response = self.anon.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.json()['title'], 'Form')
+
+    def test_edits_are_served_once_committed(self):
+        url = f"/api/forms/{self.form['id']}/"
+        self.anon.get(url)
+        form = dict(self.form, title='Renamed')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.api.put(url, form, format='json')
+        self.assertEqual(self.anon.get(url).json()['title'], 'Renamed')
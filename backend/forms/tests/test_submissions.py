@@ -0,0 +1,33 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test import TransactionTestCase
+
+from .base import client_for, make_user, question, question_ids
+
+
+class StaleSchemaTests(TransactionTestCase):
+    """
+    Runs with real commits: SQLite only reports the foreign key violation
+    from a stale cached schema when the transaction commits.
+    """
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def test_answers_to_deleted_questions_are_rejected(self):
+        api = client_for(make_user('owner'))
+        form = api.post('/api/forms/', {'title': 'Form', 'sections': [
+            {'title': 'S', 'order': 0, 'questions': [question('A'), question('B')]},
+        ]}, format='json').json()
+        kept, deleted = question_ids(form)
+        anon = client_for()
+        # Warm the cached schema, then delete behind the signals' back
+        anon.get(f"/api/forms/{form['id']}/")
+        with connection.cursor() as cursor:
+            cursor.execute('DELETE FROM forms_question WHERE id = %s', [deleted])
+
+        url = f"/api/forms/{form['id']}/submit/"
+        response = anon.post(url, {'answers': [{'question': kept, 'value': 'x'}, {'question': deleted, 'value': 'y'}]}, format='json')
+        self.assertEqual(response.status_code, 400, response.content)
+        response = anon.post(url, {'answers': [{'question': kept, 'value': 'x'}]}, format='json')
+        self.assertEqual(response.status_code, 201, response.content)
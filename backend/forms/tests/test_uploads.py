@@ -0,0 +1,89 @@
+import hashlib
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+from unittest import mock
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import override_settings
+from django.utils import timezone
+
+from forms import uploads
+from forms.models import UploadSession
+
+from .base import APITestCase, client_for, make_user
+
+
+class UploadSessionTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media, ignore_errors=True)
+        settings = override_settings(MEDIA_ROOT=media)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        patcher = mock.patch.object(uploads, 'SESSION_DIR', os.path.join(media, 'upload-sessions'))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.data = os.urandom(300_000)
+
+    def open_session(self, client=None, size=None):
+        return (client or self.api).post(
+            '/api/upload/sessions/', {'filename': 'report.bin', 'size': len(self.data) if size is None else size}, format='json'
+        )
+
+    def send(self, session_id, offset, chunk, client=None):
+        return (client or self.api).post(
+            f'/api/upload/sessions/{session_id}/chunks/?offset={offset}', {'chunk': SimpleUploadedFile('c', chunk)}, format='multipart'
+        )
+
+    def test_chunks_must_continue_at_the_received_offset(self):
+        session_id = self.open_session().json()['id']
+
+        response = self.send(session_id, 0, self.data[:100_000])
+        self.assertEqual(response.json()['received'], 100_000)
+        # A replayed or skipped chunk is refused and the server's offset reported
+        self.assertEqual(self.send(session_id, 0, self.data[:100_000]).status_code, 409)
+        self.assertEqual(self.send(session_id, 150_000, self.data[150_000:]).status_code, 409)
+        # Resume from where the server says it stopped
+        self.assertEqual(self.api.get(f'/api/upload/sessions/{session_id}/').json()['received'], 100_000)
+        response = self.send(session_id, 100_000, self.data[100_000:])
+        self.assertEqual(response.json()['received'], len(self.data))
+        # Nothing past the declared size
+        self.assertEqual(self.send(session_id, len(self.data), b'x').status_code, 400)
+
+    def test_finalize_checks_the_digest_and_cleans_up(self):
+        session_id = self.open_session().json()['id']
+        self.send(session_id, 0, self.data)
+
+        url = f'/api/upload/sessions/{session_id}/finalize/'
+        self.assertEqual(self.api.post(url, {'sha256': '0' * 64}, format='json').status_code, 400)
+        response = self.api.post(url, {'sha256': hashlib.sha256(self.data).hexdigest()}, format='json')
+
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual(response.json()['sha256'], hashlib.sha256(self.data).hexdigest())
+        self.assertFalse(UploadSession.objects.exists())
+        self.assertEqual(os.listdir(uploads.SESSION_DIR), [])
+
+    def test_incomplete_sessions_cannot_be_finalized(self):
+        session_id = self.open_session().json()['id']
+        self.send(session_id, 0, self.data[:10])
+        response = self.api.post(f'/api/upload/sessions/{session_id}/finalize/', {}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_sessions_belong_to_their_owner(self):
+        session_id = self.open_session().json()['id']
+        self.assertEqual(self.open_session(client=self.anon).status_code, 401)
+        self.assertEqual(self.anon.get(f'/api/upload/sessions/{session_id}/').status_code, 401)
+        stranger = client_for(make_user('stranger'))
+        self.assertEqual(self.send(session_id, 0, self.data, client=stranger).status_code, 404)
+
+    def test_open_sessions_are_capped_and_idle_ones_purged(self):
+        for _ in range(uploads.MAX_OPEN_SESSIONS):
+            self.assertEqual(self.open_session(size=1).status_code, 201)
+        self.assertEqual(self.open_session(size=1).status_code, 400)
+
+        UploadSession.objects.update(updated_at=timezone.now() - timedelta(seconds=uploads.SESSION_IDLE_TIMEOUT + 60))
+        self.assertEqual(self.open_session(size=1).status_code, 201)
+        self.assertEqual(UploadSession.objects.count(), 1)
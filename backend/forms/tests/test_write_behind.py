@@ -0,0 +1,104 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import override_settings
+from django.utils import timezone
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from forms.models import Answer, Form, NotificationOutbox, PendingSubmission, Response
+from forms.submissions import flush_pending
+
+from .base import APITestCase, choice, question_ids
+
+
+@override_settings(SUBMISSION_WRITE_BEHIND=True)
+class WriteBehindTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.form = self.create_form(
+            [{'title': 'S', 'order': 0, 'questions': [choice(f'Q{i}', 'A', 'B') for i in range(3)]}],
+            notify_creator=True,
+        )
+        self.url = f"/api/forms/{self.form['id']}/submit/"
+        self.body = {'answers': [{'question': qid, 'value': 'B'} for qid in question_ids(self.form)]}
+        self.bearer = 'Bearer ' + str(RefreshToken.for_user(self.owner).access_token)
+
+    def accept(self, count=1, **headers):
+        for _ in range(count):
+            response = self.anon.post(self.url, self.body, format='json', **headers)
+            self.assertEqual(response.status_code, 202, response.content)
+
+    def test_flush_writes_responses_answers_and_notifications(self):
+        self.accept(7)
+        self.assertEqual(PendingSubmission.objects.count(), 7)
+        self.assertFalse(Response.objects.exists())
+        accepted_at = PendingSubmission.objects.order_by('id').values_list('created_at', flat=True)[0]
+
+        self.assertEqual(flush_pending(5), 5)
+        call_command('flush_submissions', '--once', '--batch-size', '5', stdout=StringIO())
+
+        self.assertFalse(PendingSubmission.objects.exists())
+        self.assertEqual(Response.objects.count(), 7)
+        self.assertEqual(Answer.objects.filter(value_option__text='B').count(), 21)
+        self.assertEqual(NotificationOutbox.objects.count(), 7)
+        self.assertEqual(Response.objects.order_by('id').first().created_at, accepted_at)
+
+    def change_form(self, **fields):
+        form = Form.objects.get(pk=self.form['id'])
+        for field, value in fields.items():
+            setattr(form, field, value)
+        # Through save(), so the cached schema is dropped on commit
+        with self.captureOnCommitCallbacks(execute=True):
+            form.save()
+
+    def test_closed_forms_are_refused_before_acknowledging(self):
+        for fields in ({'is_active': False}, {'is_active': True, 'expiry_at': timezone.now() - timedelta(minutes=1)}):
+            self.change_form(**fields)
+            for headers in ({}, {'HTTP_AUTHORIZATION': self.bearer}):
+                response = self.anon.post(self.url, self.body, format='json', **headers)
+                self.assertEqual(response.status_code, 400, response.content)
+                self.assertEqual(response.json()['detail'], 'This form is no longer accepting responses.')
+            # The synchronous endpoint applies the same rule
+            payload = {'form': self.form['id'], **self.body}
+            self.assertEqual(self.anon.post('/api/responses/', payload, format='json').status_code, 400)
+
+        self.assertFalse(PendingSubmission.objects.exists())
+        self.assertFalse(Response.objects.exists())
+
+    def test_rows_rejected_at_flush_are_kept_and_logged(self):
+        self.accept(2)
+        self.change_form(is_active=False)
+
+        with self.assertLogs('forms.submissions', 'WARNING') as logs:
+            self.assertEqual(flush_pending(), 2)
+
+        self.assertFalse(Response.objects.exists())
+        rejected = PendingSubmission.objects.filter(status='rejected')
+        self.assertEqual(rejected.count(), 2)
+        self.assertEqual(set(rejected.values_list('rejected_reason', flat=True)), {'The form is no longer accepting responses.'})
+        self.assertEqual(logs.records[0].event, 'submissions.rejected')
+        self.assertEqual({row['id'] for row in logs.records[0].rejected}, set(rejected.values_list('id', flat=True)))
+        # Not picked up again
+        self.assertEqual(flush_pending(), 0)
+
+    def test_single_response_forms_keep_one_response_per_user(self):
+        self.accept(3, HTTP_AUTHORIZATION=self.bearer)
+        self.accept()
+        Form.objects.filter(pk=self.form['id']).update(allow_multiple_responses=False)
+
+        self.assertEqual(flush_pending(), 4)
+
+        own = Response.objects.get(respondent=self.owner)
+        self.assertTrue(own.single_submission)
+        self.assertEqual(Response.objects.filter(respondent=None).count(), 1)
+        repeats = PendingSubmission.objects.filter(respondent=self.owner, status='rejected')
+        self.assertEqual(repeats.count(), 2)
+
+    def test_single_response_forms_are_written_directly(self):
+        Form.objects.filter(pk=self.form['id']).update(allow_multiple_responses=False)
+        cache.clear()
+        response = self.anon.post(self.url, self.body, format='json', HTTP_AUTHORIZATION=self.bearer)
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual(flush_pending(), 0)
@@ -0,0 +1,111 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from forms.models import Option, Question, Section
+
+from .base import APITestCase, choice, question
+
+
+class FormTreeWriterTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.form = self.create_form([
+            {'title': 'One', 'order': 0, 'questions': [choice('Colour', 'Red', 'Blue'), question('Name')]},
+            {'title': 'Two', 'order': 1, 'questions': [question('Notes', 'long_text')]},
+        ])
+
+    def put(self, form):
+        return self.api.put(f"/api/forms/{form['id']}/", form, format='json')
+
+    def test_temp_ids_resolve_in_logic_rules(self):
+        form = self.form
+        new = question('Follow-up', temp_id='tmp-1')
+        form['sections'][0]['questions'].append(new)
+        form['sections'][0]['questions'][0]['logic_rules'] = {'condition': {'question_id': 'tmp-1', 'value': 'x'}}
+
+        response = self.put(form)
+
+        self.assertEqual(response.status_code, 200, response.content)
+        created = Question.objects.get(text='Follow-up')
+        colour = Question.objects.get(text='Colour')
+        self.assertEqual(colour.logic_rules['condition']['question_id'], created.id)
+
+    def test_new_form_resolves_temp_ids(self):
+        form = self.create_form([{'title': 'S', 'order': 0, 'questions': [
+            question('First', logic_rules={'condition': {'question_id': 'later'}}),
+            question('Second', temp_id='later'),
+        ]}])
+        first = Question.objects.get(section__form_id=form['id'], text='First')
+        second = Question.objects.get(section__form_id=form['id'], text='Second')
+        self.assertEqual(first.logic_rules['condition']['question_id'], second.id)
+
+    def test_ids_from_another_form_are_rejected(self):
+        other = self.create_form([{'title': 'Other', 'order': 0, 'questions': [choice('Theirs', 'A')]}])
+        theirs = other['sections'][0]['questions'][0]
+
+        for mutate in (
+            lambda form: form['sections'][0]['questions'].append(dict(theirs)),
+            lambda form: form['sections'].append(dict(other['sections'][0])),
+            lambda form: form['sections'][0]['questions'][0]['options'].append(dict(theirs['options'][0])),
+        ):
+            form = self.api.get(f"/api/forms/{self.form['id']}/").json()
+            mutate(form)
+            response = self.put(form)
+            self.assertEqual(response.status_code, 400, response.content)
+
+        # Nothing moved across
+        self.assertEqual(Question.objects.get(text='Theirs').section.form_id, other['id'])
+        self.assertEqual(Option.objects.get(text='A').question.text, 'Theirs')
+
+    def test_leftovers_are_deleted_and_moves_keep_ids(self):
+        form = self.form
+        one, two = form['sections']
+        colour, name = one['questions']
+        colour['options'] = colour['options'][:1]
+        # Name moves to the second section; the second section's own question is dropped
+        two['questions'] = [name]
+        one['questions'] = [colour]
+
+        response = self.put(form)
+
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertFalse(Question.objects.filter(text='Notes').exists())
+        self.assertEqual(list(Option.objects.filter(question_id=colour['id']).values_list('text', flat=True)), ['Red'])
+        moved = Question.objects.get(pk=name['id'])
+        self.assertEqual(moved.section_id, two['id'])
+
+        form['sections'] = [form['sections'][0]]
+        form['sections'][0]['questions'] = []
+        self.assertEqual(self.put(form).status_code, 200)
+        self.assertEqual(Section.objects.filter(form_id=form['id']).count(), 1)
+        self.assertFalse(Question.objects.filter(section__form_id=form['id']).exists())
+        self.assertFalse(Option.objects.filter(question__section__form_id=form['id']).exists())
+
+    def test_tree_is_read_once_and_returned_as_written(self):
+        form = self.form
+        one, two = form['sections']
+        colour, name = one['questions']
+        colour['options'].append({'text': 'Green', 'order': 2})
+        one['questions'] = [colour]
+        two['questions'].insert(0, dict(name, order=0))
+        two['questions'][1]['order'] = 1
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.put(form)
+
+        self.assertEqual(response.status_code, 200, response.content)
+        for table in ('forms_section', 'forms_question', 'forms_option'):
+            reads = [q['sql'] for q in ctx.captured_queries if q['sql'].startswith(f'SELECT "{table}"')]
+            self.assertEqual(len(reads), 1, reads)
+        saved = self.api.get(f"/api/forms/{form['id']}/").json()
+        self.assertEqual(response.json()['sections'], saved['sections'])
+        self.assertEqual([q['text'] for q in saved['sections'][1]['questions']], ['Name', 'Notes'])
+        self.assertEqual([o['text'] for o in saved['sections'][0]['questions'][0]['options']], ['Red', 'Blue', 'Green'])
+
+    def test_created_tree_is_returned_without_reading_it_back(self):
+        with CaptureQueriesContext(connection) as ctx:
+            form = self.create_form([{'title': 'S', 'order': 0, 'questions': [choice('Pick', 'A', 'B')]}])
+        reads = [q['sql'] for q in ctx.captured_queries if q['sql'].startswith(('SELECT "forms_section"', 'SELECT "forms_question"', 'SELECT "forms_option"'))]
+        self.assertEqual(reads, [])
+        self.assertEqual([o['text'] for o in form['sections'][0]['questions'][0]['options']], ['A', 'B'])
+        self.assertTrue(all(o['id'] for o in form['sections'][0]['questions'][0]['options']))
@@ -0,0 +1,152 @@
+import base64
+import binascii
+import os
+import tempfile
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files import File
+from django.db import transaction
+from django.utils import timezone
+from rest_framework import serializers
+
+from .blobs import file_digest, store_blob
+from .models import UploadSession
+
+# Peak memory per upload is about one chunk: files are streamed through in
+# CHUNK_SIZE pieces and never read whole.
+CHUNK_SIZE = getattr(settings, 'UPLOAD_CHUNK_SIZE', 1024 * 1024)
+MAX_UPLOAD_SIZE = getattr(settings, 'UPLOAD_MAX_SIZE', 100 * 1024 * 1024)
+# Part files of unfinished uploads; never under MEDIA_ROOT, which may be served
+SESSION_DIR = getattr(settings, 'UPLOAD_SESSION_DIR', os.path.join(tempfile.gettempdir(), 'forms-upload-sessions'))
+# Sessions idle this long are abandoned, and purged
+SESSION_IDLE_TIMEOUT = getattr(settings, 'UPLOAD_SESSION_IDLE_TIMEOUT', 60 * 60 * 24)
+MAX_OPEN_SESSIONS = getattr(settings, 'UPLOAD_MAX_OPEN_SESSIONS', 10)
+
+
+class OffsetMismatch(Exception):
+    def __init__(self, expected):
+        super().__init__(f"Expected a chunk at offset {expected}.")
+        self.expected = expected
+
+
+def store_upload(file_obj, name):
+    """
+    Store an uploaded file (or any File) in the content-addressed blob store,
+    streamed in chunks. Returns the StoredBlob.
+    """
+    return store_blob(file_obj, os.path.basename(name))
+
+
+def decode_data_url(data_url):
+    """
+    Decode a `data:<type>;base64,<payload>` string into a spooled temp file
+    a slice at a time, rather than materializing the decoded bytes at once.
+    Returns (file, extension).
+    """
+    header, _, payload = data_url.partition(';base64,')
+    if not payload:
+        raise serializers.ValidationError({'file_data': 'Expected a base64 data URL.'})
+    ext = header.split('/')[-1] or 'bin'
+
+    spool = tempfile.SpooledTemporaryFile(max_size=CHUNK_SIZE)
+    # Multiple of 4 so every slice decodes on its own
+    step = CHUNK_SIZE - CHUNK_SIZE % 4
+    try:
+        for start in range(0, len(payload), step):
+            spool.write(base64.b64decode(payload[start:start + step], validate=True))
+    except (binascii.Error, ValueError):
+        spool.close()
+        raise serializers.ValidationError({'file_data': 'Invalid base64 payload.'})
+    spool.seek(0)
+    return File(spool, name=f"{uuid.uuid4()}.{ext}"), ext
+
+
+def store_data_url(data_url):
+    content, _ = decode_data_url(data_url)
+    with content:
+        return store_upload(content, content.name)
+
+
+def part_path(session):
+    return os.path.join(SESSION_DIR, f'{session.id}.part')
+
+
+def append_chunk(session_id, offset, chunk):
+    """
+    Append an uploaded chunk at `offset`. Offsets must match what has been
+    received so far, so a client can retry or resume after a dropped
+    connection without duplicating data. Returns the updated session.
+    """
+    with transaction.atomic():
+        # Row lock serializes concurrent appends to the same session
+        session = UploadSession.objects.select_for_update().get(pk=session_id)
+        if offset != session.received:
+            raise OffsetMismatch(session.received)
+
+        limit = session.size if session.size is not None else MAX_UPLOAD_SIZE
+        if session.received + chunk.size > limit:
+            raise serializers.ValidationError({'chunk': f"Upload exceeds {limit} bytes."})
+
+        os.makedirs(SESSION_DIR, exist_ok=True)
+        path = part_path(session)
+        with open(path, 'r+b' if os.path.exists(path) else 'wb') as part:
+            # Drop anything past the committed offset (a write that died mid-way)
+            part.seek(session.received)
+            part.truncate()
+            for piece in chunk.chunks(CHUNK_SIZE):
+                part.write(piece)
+
+        session.received += chunk.size
+        session.save(update_fields=['received', 'updated_at'])
+    return session
+
+
+def finalize_session(session, sha256=None):
+    """
+    Move a completed session's part file into the blob store and delete the
+    session. `sha256`, if given, must match the assembled content.
+    """
+    if session.size is not None and session.received != session.size:
+        raise serializers.ValidationError({'size': f"Received {session.received} of {session.size} bytes."})
+
+    path = part_path(session)
+    if not os.path.exists(path):
+        if session.received:
+            raise serializers.ValidationError({'detail': 'Upload data is missing; start a new upload.'})
+        open(path, 'wb').close()
+
+    with open(path, 'rb') as part:
+        digest = file_digest(part)
+        if sha256 and sha256.lower() != digest[0]:
+            raise serializers.ValidationError({'sha256': 'Checksum mismatch; the upload was corrupted.'})
+        blob = store_blob(part, session.filename, digest)
+
+    discard_session(session)
+    return blob
+
+
+def discard_session(session):
+    try:
+        os.remove(part_path(session))
+    except FileNotFoundError:
+        pass
+    session.delete()
+
+
+def purge_sessions(idle_for=SESSION_IDLE_TIMEOUT, limit=None):
+    """
+    Discard sessions (and their part files) not written to for `idle_for`
+    seconds, oldest first. Returns the number purged.
+    """
+    sessions = UploadSession.objects.filter(
+        updated_at__lt=timezone.now() - timedelta(seconds=idle_for)
+    ).order_by('updated_at')
+    if limit is not None:
+        sessions = sessions[:limit]
+    purged = 0
+    for session in sessions.iterator():
+        discard_session(session)
+        purged += 1
+    return purged
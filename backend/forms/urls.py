@@ -3,7 +3,7 @@ from rest_framework.routers import DefaultRouter
 from .views import (
     FormViewSet, SectionViewSet, QuestionViewSet, OptionViewSet, 
     ResponseViewSet, AnswerViewSet, RegisterView, UploadView, EmailDiagnosticView,
-    RoleViewSet, AdminUserViewSet
+    RoleViewSet, AdminUserViewSet, UploadSessionViewSet, submit_response
 )
 
 router = DefaultRouter()
@@ -15,8 +15,11 @@ router.register(r'responses', ResponseViewSet, basename='response')
 router.register(r'answers', AnswerViewSet)
 router.register(r'roles', RoleViewSet, basename='role')
 router.register(r'admin/users', AdminUserViewSet, basename='admin-user')
+router.register(r'upload/sessions', UploadSessionViewSet, basename='upload-session')
 
 urlpatterns = [
+    # Async view; ahead of the router so it isn't taken for a form detail route
+    path('forms/<str:lookup>/submit/', submit_response, name='form-submit'),
     path('', include(router.urls)),
     path('register/', RegisterView.as_view(), name='register'),
     path('diag-email/', EmailDiagnosticView.as_view(), name='diag-email'),
@@ -0,0 +1,205 @@
+from django.db import connection, transaction
+from django.db.models import prefetch_related_objects
+from rest_framework import serializers
+
+from .blobs import answer_file_urls, release
+from .models import Section, Question, Option
+
+
+class FormTreeWriter:
+    """
+    Set-based writer for the nested Section -> Question -> Option tree of a form.
+
+    The editor always sends the whole tree. Instead of saving row by row, the
+    current tree is loaded once, diffed against the payload in memory and the
+    result is applied with one bulk_create / bulk_update / DELETE per level.
+    Logic rule temp_ids are resolved in the same pass, and the written tree is
+    left in the form's prefetch cache so serializing it needs no queries.
+    """
+
+    def __init__(self, form):
+        self.form = form
+        self.temp_id_map = {}
+        self.sections = {}
+        self.questions = {}
+        self.options = {}
+
+    def load(self):
+        # Reuses a sections__questions__options prefetch the caller already did
+        prefetch_related_objects([self.form], 'sections__questions__options')
+        for section in self.form.sections.all():
+            self.sections[section.id] = section
+            for question in section.questions.all():
+                self.questions[question.id] = question
+                self.options.update((option.id, option) for option in question.options.all())
+        return self
+
+    def write(self, sections_data):
+        with transaction.atomic():
+            section_plan = self._write_sections(sections_data)
+            question_plan = self._write_questions(section_plan)
+            option_plan = self._write_options(question_plan)
+
+            # Anything not claimed by the payload has been removed in the editor.
+            # Answers to removed questions cascade with them, so release the
+            # files they hold first.
+            file_questions = [q.id for q in self.questions.values() if q.question_type == 'file_upload']
+            if file_questions:
+                release(*answer_file_urls(question_id__in=file_questions))
+            # Children first so the cascade collector has nothing left to walk.
+            for model, leftovers in ((Option, self.options), (Question, self.questions), (Section, self.sections)):
+                if leftovers:
+                    model.objects.filter(id__in=list(leftovers)).delete()
+
+        self._cache_tree(section_plan, question_plan, option_plan)
+        return self.form
+
+    def _write_sections(self, sections_data):
+        plan, new, dirty, fields = [], [], {}, set()
+        for section_data in sections_data:
+            section_data = dict(section_data)
+            questions_data = section_data.pop('questions', [])
+            section_data.pop('form', None)
+            section_id = section_data.pop('id', None)
+
+            if section_id:
+                section = self._claim(self.sections, section_id, 'Section')
+                if self._assign(section, section_data, fields):
+                    dirty[section.id] = section
+            else:
+                section = Section(form=self.form, **section_data)
+                new.append(section)
+            plan.append((section, questions_data))
+
+        self._bulk_create(Section, new)
+        self._bulk_update(Section, dirty.values(), fields)
+        return plan
+
+    def _write_questions(self, section_plan):
+        plan, new, dirty, fields = [], [], {}, set()
+        incoming = []
+        for section, questions_data in section_plan:
+            for q_data in questions_data:
+                q_data = dict(q_data)
+                options_data = q_data.pop('options', [])
+                temp_id = q_data.pop('temp_id', None)
+                q_data.pop('section', None)
+                q_id = q_data.pop('id', None)
+
+                if q_id:
+                    question = self._claim(self.questions, q_id, 'Question')
+                    changed = self._assign(question, q_data, fields)
+                    if question.section_id != section.id:
+                        question.section = section
+                        fields.add('section')
+                        changed = True
+                    if changed:
+                        dirty[question.id] = question
+                else:
+                    question = Question(section=section, **q_data)
+                    new.append((temp_id, question))
+                incoming.append(question)
+                plan.append((section, question, options_data))
+
+        self._bulk_create(Question, [q for _, q in new])
+        for temp_id, question in new:
+            if temp_id:
+                self.temp_id_map[str(temp_id)] = question.id
+
+        # Resolve logic rules that point at questions created in this save
+        for question in incoming:
+            if question.logic_rules and 'condition' in question.logic_rules:
+                condition = question.logic_rules['condition']
+                target_q_id = str(condition.get('question_id'))
+                if target_q_id in self.temp_id_map:
+                    condition['question_id'] = self.temp_id_map[target_q_id]
+                    fields.add('logic_rules')
+                    dirty[question.id] = question
+
+        self._bulk_update(Question, dirty.values(), fields)
+        return plan
+
+    def _write_options(self, question_plan):
+        plan, new, dirty, fields = [], [], {}, set()
+        for _, question, options_data in question_plan:
+            for opt_data in options_data:
+                opt_data = dict(opt_data)
+                opt_id = opt_data.pop('id', None)
+
+                if opt_id:
+                    opt = self._claim(self.options, opt_id, 'Option')
+                    changed = self._assign(opt, opt_data, fields)
+                    if opt.question_id != question.id:
+                        opt.question = question
+                        fields.add('question')
+                        changed = True
+                    if changed:
+                        dirty[opt.id] = opt
+                else:
+                    opt = Option(question=question, **opt_data)
+                    new.append(opt)
+                plan.append((question, opt))
+
+        self._bulk_create(Option, new)
+        self._bulk_update(Option, dirty.values(), fields)
+        return plan
+
+    def _cache_tree(self, section_plan, question_plan, option_plan):
+        questions = {section.id: [] for section, _ in section_plan}
+        for section, question, _ in question_plan:
+            questions[section.id].append(question)
+        options = {question.id: [] for _, question, _ in question_plan}
+        for question, opt in option_plan:
+            options[question.id].append(opt)
+
+        # Stable sorts: the models' `order` ordering, ties in payload order
+        by_order = lambda obj: obj.order
+        self._set_prefetched(self.form, 'sections', sorted((section for section, _ in section_plan), key=by_order))
+        for section, _ in section_plan:
+            self._set_prefetched(section, 'questions', sorted(questions[section.id], key=by_order))
+        for _, question, _ in question_plan:
+            self._set_prefetched(question, 'options', sorted(options[question.id], key=by_order))
+
+    @staticmethod
+    def _set_prefetched(obj, name, children):
+        # What prefetch_related_objects leaves behind, so obj.<name>.all() is served from memory
+        queryset = getattr(obj, name).all()
+        queryset._result_cache = children
+        queryset._prefetch_done = True
+        if not hasattr(obj, '_prefetched_objects_cache'):
+            obj._prefetched_objects_cache = {}
+        obj._prefetched_objects_cache[name] = queryset
+
+    @staticmethod
+    def _claim(existing, pk, label):
+        try:
+            return existing.pop(pk)
+        except KeyError:
+            raise serializers.ValidationError({'sections': f"{label} {pk} does not belong to this form."})
+
+    @staticmethod
+    def _assign(obj, data, fields):
+        changed = False
+        for attr, value in data.items():
+            if getattr(obj, attr) != value:
+                setattr(obj, attr, value)
+                fields.add(attr)
+                changed = True
+        return changed
+
+    @staticmethod
+    def _bulk_create(model, objs):
+        if not objs:
+            return
+        if connection.features.can_return_rows_from_bulk_insert:
+            model.objects.bulk_create(objs)
+        else:
+            # Backends that can't return PKs from a multi-row INSERT
+            for obj in objs:
+                obj.save()
+
+    @staticmethod
+    def _bulk_update(model, objs, fields):
+        objs = list(objs)
+        if objs and fields:
+            model.objects.bulk_update(objs, sorted(fields))
@@ -331,24 +331,12 @@ const FormEditor = () => {
                                     onChange={(e) => {
                                         const file = e.target.files[0];
                                         if (file) {
-                                            // Robust Base64 Reader in UI Thread
-                                            const reader = new FileReader();
-                                            reader.onload = async (ev) => {
-                                                try {
-                                                    const base64 = ev.target.result;
-                                                    const res = await formService.uploadBase64(base64);
-                                                    setForm(prev => ({ ...prev, logo_image: res.url }));
-                                                } catch (err) {
+                                            formService.uploadFile(file)
+                                                .then(res => setForm(prev => ({ ...prev, logo_image: res.url })))
+                                                .catch(err => {
                                                     console.error("Upload Error:", err);
                                                     alert(`Upload failed: ${err.message || JSON.stringify(err)}`);
-                                                }
-                                            };
-                                            reader.onerror = (err) => alert("Browser could not read file. Try a different folder (e.g. Desktop).");
-                                            try {
-                                                reader.readAsDataURL(file);
-                                            } catch (readErr) {
-                                                alert("Immediate File Access Error. Permission denied.");
-                                            }
+                                                });
                                         }
                                     }}
                                     style={{ marginBottom: '0.5rem', display: 'block', width: '100%' }}
@@ -388,18 +376,12 @@ const FormEditor = () => {
                                     onChange={(e) => {
                                         const file = e.target.files[0];
                                         if (file) {
-                                            const reader = new FileReader();
-                                            reader.onload = async (ev) => {
-                                                try {
-                                                    const base64 = ev.target.result;
-                                                    const res = await formService.uploadBase64(base64);
-                                                    setForm(prev => ({ ...prev, background_image: res.url }));
-                                                } catch (err) {
+                                            formService.uploadFile(file)
+                                                .then(res => setForm(prev => ({ ...prev, background_image: res.url })))
+                                                .catch(err => {
                                                     console.error("Upload Error:", err);
                                                     alert(`Upload failed: ${err.message || JSON.stringify(err)}`);
-                                                }
-                                            };
-                                            reader.readAsDataURL(file);
+                                                });
                                         }
                                     }}
                                     style={{ marginBottom: '0.5rem', display: 'block', width: '100%' }}
@@ -530,29 +512,22 @@ const FormEditor = () => {
                                                 const file = e.target.files[0];
                                                 if (!file) return;
 
-                                                const reader = new FileReader();
-                                                reader.onload = async (event) => {
-                                                    const text = event.target.result;
-                                                    // Simple regex to extract emails from CSV
-                                                    const emails = text.match(/([a-zA-Z0-9._-]+@[a-zA-Z0-9._-]+\.[a-zA-Z0-9._-]+)/gi);
+                                                e.target.value = null; // Reset input
+                                                if (!window.confirm(`Import invitees from ${file.name}?`)) return;
 
-                                                    if (!emails || emails.length === 0) {
-                                                        alert("No valid emails found in file.");
+                                                try {
+                                                    // Parsed and deduplicated server-side; large lists are queued
+                                                    const res = await formService.importInvitees(id, file);
+                                                    if (res.status === 202) {
+                                                        alert(`Importing ${res.data.rows} rows in the background. Refresh the list in a moment.`);
                                                         return;
                                                     }
-
-                                                    if (window.confirm(`Found ${emails.length} emails. Import them?`)) {
-                                                        try {
-                                                            const res = await formService.addInvitees(id, emails);
-                                                            alert(`Successfully added ${res.data.added} emails.`);
-                                                            fetchInvitees();
-                                                        } catch (err) {
-                                                            alert("Import failed: " + err.message);
-                                                        }
-                                                    }
-                                                    e.target.value = null; // Reset input
-                                                };
-                                                reader.readAsText(file);
+                                                    const { added, exists, duplicate, invalid } = res.data.counts;
+                                                    alert(`Added ${added} emails (${exists} already invited, ${duplicate} duplicates, ${invalid} invalid).`);
+                                                    fetchInvitees();
+                                                } catch (err) {
+                                                    alert("Import failed: " + err.message);
+                                                }
                                             }}
                                         />
                                     </label>
@@ -1,25 +1,28 @@
 import React, { useState, useEffect } from 'react';
 import { Link, useNavigate } from 'react-router-dom';
-import { formService } from '../services/api';
+import api, { formService } from '../services/api';
 import { Plus, Edit2, Trash2, FileText, BarChart2, Eye, LayoutGrid, List, CheckCircle } from 'lucide-react';
 import Card from '../components/UI/Card';
 import Button from '../components/UI/Button';
 
 const FormList = () => {
     const [forms, setForms] = useState([]);
+    const [nextPage, setNextPage] = useState(null);
     const [loading, setLoading] = useState(true);
+    const [loadingMore, setLoadingMore] = useState(false);
     const [viewMode, setViewMode] = useState('grid'); // 'grid' or 'list'
     const [filterMode, setFilterMode] = useState('all');
     const navigate = useNavigate();
 
     useEffect(() => {
         fetchForms();
-    }, []);
+    }, [filterMode]);
 
     const fetchForms = async () => {
         try {
-            const response = await formService.getForms();
-            setForms(response.data);
+            const response = await formService.getForms(filterMode === 'all' ? {} : { scope: filterMode });
+            setForms(response.data.results);
+            setNextPage(response.data.next);
         } catch (error) {
             console.error('Error fetching forms:', error);
         } finally {
@@ -27,6 +30,20 @@ const FormList = () => {
         }
     };
 
+    const loadMore = async () => {
+        if (!nextPage) return;
+        setLoadingMore(true);
+        try {
+            const response = await api.get(nextPage);
+            setForms(prev => [...prev, ...response.data.results]);
+            setNextPage(response.data.next);
+        } catch (error) {
+            console.error('Error loading more forms:', error);
+        } finally {
+            setLoadingMore(false);
+        }
+    };
+
     const handleDelete = async (id) => {
         if (window.confirm('Are you sure you want to delete this form?')) {
             try {
@@ -38,12 +55,8 @@ const FormList = () => {
         }
     };
 
-    const filteredForms = forms.filter(f => {
-        if (filterMode === 'owned') return f.my_role === 'owner';
-        if (filterMode === 'shared') return f.my_role && f.my_role !== 'owner';
-        if (filterMode === 'responded') return f.has_responded;
-        return true;
-    });
+    // Tabs are filtered server-side (?scope=)
+    const filteredForms = forms;
 
     if (loading) return <div className="loading">Loading forms...</div>;
 
@@ -210,6 +223,9 @@ const FormList = () => {
                                 <div style={{ fontSize: '0.7rem', color: '#6B7280', display: 'flex', flexDirection: 'column', gap: '2px', marginBottom: 'var(--space-2)' }}>
                                     <div><strong>Created:</strong> {new Date(form.created_at).toLocaleString()}</div>
                                     <div><strong>Edited:</strong> {new Date(form.updated_at).toLocaleString()}</div>
+                                    {form.my_role && (
+                                        <div><strong>Responses:</strong> {form.response_count}{form.last_response_at && ` (last ${new Date(form.last_response_at).toLocaleString()})`}</div>
+                                    )}
                                     {form.published_at && (
                                         <div style={{ color: '#059669' }}><strong>Published:</strong> {new Date(form.published_at).toLocaleString()}</div>
                                     )}
@@ -269,6 +285,13 @@ const FormList = () => {
                 </div>
             )
             }
+            {nextPage && (
+                <div style={{ textAlign: 'center', marginTop: 'var(--space-6)' }}>
+                    <Button variant="secondary" onClick={loadMore} disabled={loadingMore}>
+                        {loadingMore ? 'Loading...' : 'Load more'}
+                    </Button>
+                </div>
+            )}
         </div >
     );
 };
@@ -10,7 +10,10 @@ const FormResults = () => {
     const navigate = useNavigate();
     const [form, setForm] = useState(null);
     const [responses, setResponses] = useState([]);
+    const [nextPage, setNextPage] = useState(null);
+    const [summary, setSummary] = useState(null);
     const [loading, setLoading] = useState(true);
+    const [loadingMore, setLoadingMore] = useState(false);
 
     useEffect(() => {
         fetchData();
@@ -18,12 +21,15 @@ const FormResults = () => {
 
     const fetchData = async () => {
         try {
-            const [formRes, responsesRes] = await Promise.all([
+            const [formRes, responsesRes, summaryRes] = await Promise.all([
                 api.get(`forms/${id}/`),
-                api.get(`responses/?form=${id}`)
+                api.get(`responses/?form=${id}`),
+                api.get(`forms/${id}/results/`)
             ]);
             setForm(formRes.data);
-            setResponses(responsesRes.data);
+            setSummary(summaryRes.data);
+            setResponses(responsesRes.data.results);
+            setNextPage(responsesRes.data.next);
             setLoading(false);
         } catch (error) {
             console.error('Error loading results:', error);
@@ -31,6 +37,20 @@ const FormResults = () => {
         }
     };
 
+    const loadMore = async () => {
+        if (!nextPage) return;
+        setLoadingMore(true);
+        try {
+            const res = await api.get(nextPage);
+            setResponses(prev => [...prev, ...res.data.results]);
+            setNextPage(res.data.next);
+        } catch (error) {
+            console.error('Error loading more responses:', error);
+        } finally {
+            setLoadingMore(false);
+        }
+    };
+
     const handleExport = async () => {
         try {
             const response = await api.get('responses/export_csv/', {
@@ -65,7 +85,7 @@ const FormResults = () => {
                     </Button>
                     <div>
                         <h1 style={{ margin: 0, fontSize: '1.25rem' }}>{form.title} Results</h1>
-                        <p style={{ margin: 0, fontSize: '0.875rem', color: 'var(--color-text-muted)' }}>{responses.length} total responses</p>
+                        <p style={{ margin: 0, fontSize: '0.875rem', color: 'var(--color-text-muted)' }}>{summary ? summary.total_responses : responses.length} total responses</p>
                     </div>
                 </div>
                 <Button variant="primary" onClick={handleExport}>
@@ -119,6 +139,13 @@ const FormResults = () => {
                         </tbody>
                     </table>
                 </div>
+                {nextPage && (
+                    <div style={{ padding: '1rem', textAlign: 'center' }}>
+                        <Button variant="secondary" onClick={loadMore} disabled={loadingMore}>
+                            {loadingMore ? 'Loading...' : 'Load more'}
+                        </Button>
+                    </div>
+                )}
             </Card>
         </div>
     );
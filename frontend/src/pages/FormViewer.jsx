@@ -9,6 +9,24 @@ const getImageUrl = (url) => {
     return url;
 };
 
+// Smallest server-made variant at least `target` pixels wide (else the largest)
+const pickVariant = (srcset, target) => {
+    const candidates = srcset.split(', ').map(entry => {
+        const [url, width] = entry.split(' ');
+        return { url, width: parseInt(width, 10) };
+    });
+    return (candidates.find(c => c.width >= target) || candidates[candidates.length - 1]).url;
+};
+
+const backgroundImageFor = (form) => {
+    if (!form.background_image) return 'none';
+    const sources = form.image_variants?.background_image?.sources || [];
+    if (!sources.length) return `url(${getImageUrl(form.background_image)})`;
+    const target = window.innerWidth * (window.devicePixelRatio || 1);
+    const candidates = sources.map(s => `url("${pickVariant(s.srcset, target)}") type("${s.type}")`);
+    return `image-set(${[...candidates, `url("${getImageUrl(form.background_image)}")`].join(', ')})`;
+};
+
 const FormViewer = () => {
     const { id } = useParams();
     const navigate = useNavigate();
@@ -207,7 +225,7 @@ const FormViewer = () => {
             minHeight: '100vh',
             paddingBottom: '4rem',
             backgroundColor: form.background_color || '#F8FAFC',
-            backgroundImage: form.background_image ? `url(${getImageUrl(form.background_image)})` : 'none',
+            backgroundImage: backgroundImageFor(form),
             backgroundSize: 'cover',
             backgroundPosition: 'center',
             backgroundAttachment: 'fixed'
@@ -221,11 +239,21 @@ const FormViewer = () => {
                         justifyContent: form.logo_alignment === 'left' ? 'flex-start' : (form.logo_alignment === 'right' ? 'flex-end' : 'center'),
                         marginBottom: '2rem'
                     }}>
-                        <img
-                            src={getImageUrl(form.logo_image)}
-                            alt="Logo"
-                            style={{ maxHeight: '120px', maxWidth: '100%', objectFit: 'contain' }}
-                        />
+                        <picture>
+                            {(form.image_variants?.logo_image?.sources || []).map(source => (
+                                <source
+                                    key={source.type}
+                                    type={source.type}
+                                    srcSet={source.srcset}
+                                    sizes={`${Math.ceil(120 * form.image_variants.logo_image.width / form.image_variants.logo_image.height)}px`}
+                                />
+                            ))}
+                            <img
+                                src={getImageUrl(form.logo_image)}
+                                alt="Logo"
+                                style={{ maxHeight: '120px', maxWidth: '100%', objectFit: 'contain' }}
+                            />
+                        </picture>
                     </div>
                 )}
 
@@ -55,7 +55,7 @@ api.interceptors.response.use(
 );
 
 export const formService = {
-    getForms: () => api.get('forms/'),
+    getForms: (params) => api.get('forms/', { params }),
     getForm: (id) => api.get(`forms/${id}/`),
     createForm: (data) => api.post('forms/', data),
     updateForm: (id, data) => api.patch(`forms/${id}/`, data),
@@ -76,25 +76,35 @@ export const formService = {
         return response.json();
     },
 
-    uploadBase64: async (base64String) => {
-        // Use 'api' instance to leverage Interceptors (Auto-Refresh Token)
-        try {
-            console.log("Sending Base64 JSON Payload via Axios...");
-            const response = await api.post('upload/', { file_data: base64String });
-            console.log("Upload Success:", response.data);
-            return response.data;
-        } catch (error) {
-            console.error("Upload Base64 Error:", error);
-            // Axios throws clean error objects usually
-            throw error;
+    // Resumable chunked upload: the file is sent in slices, and a failed slice
+    // is retried from the offset the server reports instead of starting over.
+    uploadFile: async (file, { retries = 3 } = {}) => {
+        const { data: session } = await api.post('upload/sessions/', { filename: file.name, size: file.size });
+        let offset = 0;
+        let failures = 0;
+        while (offset < file.size) {
+            const body = new FormData();
+            body.append('chunk', file.slice(offset, offset + session.chunk_size), file.name);
+            try {
+                const { data } = await api.post(`upload/sessions/${session.id}/chunks/`, body, {
+                    params: { offset },
+                    headers: { 'Content-Type': 'multipart/form-data' },
+                });
+                offset = data.received;
+                failures = 0;
+            } catch (error) {
+                if (error.response?.status === 409) {
+                    // Server already has more (or less) than we thought; resume from there
+                    offset = error.response.data.received;
+                    continue;
+                }
+                if (++failures > retries) throw error;
+                const { data } = await api.get(`upload/sessions/${session.id}/`);
+                offset = data.received;
+            }
         }
-    },
-
-    // Legacy/Fallback (FormData - seemingly unstable on this env)
-    uploadFile: async (file) => {
-        // Redirect to Base64 logic if possible, or fail. 
-        // We will change FormEditor to call uploadBase64 directly.
-        throw new Error("Use uploadBase64 instead.");
+        const { data } = await api.post(`upload/sessions/${session.id}/finalize/`);
+        return data;
     },
     deleteForm: (id) => api.delete(`forms/${id}/`),
 
@@ -107,6 +117,12 @@ export const formService = {
     // Private Access
     getInvitees: (id) => api.get(`forms/${id}/invitees/`),
     addInvitees: (id, emails) => api.post(`forms/${id}/invitees/`, { emails }),
+    importInvitees: (id, file) => {
+        const data = new FormData();
+        data.append('file', file);
+        return api.post(`forms/${id}/invitees/`, data);
+    },
+    getInviteeImport: (id, importId) => api.get(`forms/${id}/invitee_imports/${importId}/`),
     removeInvitee: (id, email) => api.delete(`forms/${id}/invitees/?email=${encodeURIComponent(email)}`),
     checkAccess: (id, email) => api.post(`forms/${id}/check_access/`, { email }),
 };